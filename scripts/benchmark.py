@@ -0,0 +1,192 @@
+"""
+Benchmarks py27hash hashing, insertion, iteration and resize hot paths. Results are written as JSON so runs can be
+compared between versions.
+
+Usage:
+    python scripts/benchmark.py [--sizes 1000,100000,1000000] [--repeat 5] [--filter name] [--output results.json]
+"""
+
+# pylint: disable = C0111,E0401
+
+import argparse
+import gc
+import json
+import pickle
+import platform
+import sys
+import time
+
+from py27hash.dict import Dict
+from py27hash.hash import Hash, BITS, native
+from py27hash.set import Set
+
+def measure(run, setup, repeat):
+    """
+    Runs a workload repeat times and collects timings. Setup runs before each repetition and isn't timed. Garbage
+    collection is disabled while timing, the same as timeit.
+
+    Args:
+        run: workload function, called with the setup output
+        setup: function that builds the workload input
+        repeat: number of repetitions
+
+    Returns:
+        dict of timings in seconds
+    """
+
+    timings = []
+    for _ in range(repeat):
+        data = setup()
+
+        enabled = gc.isenabled()
+        gc.disable()
+
+        try:
+            start = time.perf_counter()
+            run(data)
+            timings.append(time.perf_counter() - start)
+        finally:
+            if enabled:
+                gc.enable()
+
+    timings.sort()
+
+    return {
+        "min": timings[0],
+        "median": timings[len(timings) // 2],
+        "mean": sum(timings) / len(timings),
+        "repeat": repeat
+    }
+
+def keys(size, prefix="key"):
+    """
+    Builds a deterministic list of distinct string keys.
+
+    Args:
+        size: number of keys
+        prefix: key prefix
+
+    Returns:
+        list of keys
+    """
+
+    return ["%s%d" % (prefix, x) for x in range(size)]
+
+def nested(size):
+    """
+    Builds a deterministic list of nested tuples with mixed element types.
+
+    Args:
+        size: number of tuples
+
+    Returns:
+        list of tuples
+    """
+
+    return [(x, ("t%d" % x, (x * 1.5, (x, -x), "nested")), (x % 7, -1)) for x in range(size)]
+
+def mixed(d, size):
+    """
+    Runs an insert, delete and iterate loop over a Dict. Every 3rd step deletes the key inserted 5 steps before.
+    The keys are iterated over 10 times in total.
+
+    Args:
+        d: Dict
+        size: number of steps
+    """
+
+    for x in range(size):
+        d["mixed%d" % x] = x
+
+        if x % 3 == 0 and x >= 5:
+            del d["mixed%d" % (x - 5)]
+
+        if x % max(size // 10, 1) == 0:
+            for _ in d:
+                pass
+
+def workloads(sizes):
+    """
+    Builds the list of benchmark workloads.
+
+    Args:
+        sizes: Dict and Set sizes
+
+    Returns:
+        list of (name, size, run, setup)
+    """
+
+    short, longs = keys(100000), ["%08d" % x * 1250 for x in range(100)]
+
+    results = [
+        ("shash_short", len(short), lambda data: [Hash.shash(x, BITS) for x in data], lambda: short),
+        ("shash_long", len(longs), lambda data: [Hash.shash(x, BITS) for x in data], lambda: longs),
+        ("thash_nested", 10000, lambda data: [Hash.thash(x, BITS) for x in data], lambda: nested(10000))
+    ]
+
+    for size in sizes:
+        items = list(zip(keys(size), range(size)))
+        results.extend([
+            ("dict_build", size, Dict, lambda items=items: items),
+            ("dict_iterate", size, lambda data: list(data.iteritems()), lambda items=items: Dict(items)),
+            ("dict_mixed", size, lambda data, size=size: mixed(data, size), Dict),
+            ("set_update", size, lambda data: Set().update(data), lambda size=size: Set(keys(size))),
+            ("dict_pickle", size, lambda data: pickle.loads(pickle.dumps(data, 2)), lambda items=items: Dict(items)),
+            ("set_pickle", size, lambda data: pickle.loads(pickle.dumps(data, 2)), lambda size=size: Set(keys(size)))
+        ])
+
+    return results
+
+def benchmark(sizes, repeat, name=None):
+    """
+    Runs all benchmarks.
+
+    Args:
+        sizes: Dict and Set sizes
+        repeat: number of repetitions per workload
+        name: only run workloads with names containing this string, runs all if None
+
+    Returns:
+        results dict
+    """
+
+    results = []
+    for workload, size, run, setup in workloads(sizes):
+        if not name or name in workload:
+            result = {"name": workload, "size": size}
+            result.update(measure(run, setup, repeat))
+
+            results.append(result)
+
+            # Progress is written to stderr, stdout is reserved for results
+            sys.stderr.write("%-14s %9d %10.4fs\n" % (workload, size, result["min"]))
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "bits": BITS,
+        "native": native is not None,
+        "results": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs py27hash benchmarks and writes results as JSON")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="comma separated Dict and Set sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="number of repetitions per workload")
+    parser.add_argument("--filter", help="only run workloads with names containing this string")
+    parser.add_argument("--output", help="output file, defaults to stdout")
+
+    args = parser.parse_args()
+
+    results = benchmark([int(x) for x in args.sizes.split(",")], args.repeat, args.filter)
+    output = json.dumps(results, indent=2, sort_keys=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
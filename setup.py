@@ -1,5 +1,5 @@
 # pylint: disable = C0111
-from setuptools import find_packages, setup
+from setuptools import Extension, find_packages, setup
 
 with open("README.md", "r", encoding="utf-8") as f:
     DESCRIPTION = f.read()
@@ -21,12 +21,14 @@ setup(
     license="MIT License: http://opensource.org/licenses/MIT",
     packages=find_packages(where="src/python"),
     package_dir={"": "src/python"},
+    # Optional compiled hash functions, pure Python is used if the build fails
+    ext_modules=[Extension("py27hash._hash", ["src/c/hash.c"], optional=True)],
+    extras_require={"numpy": ["numpy"]},
     keywords="python hash iteration migration",
-    python_requires=">=2.7",
+    python_requires=">=3.6",
     classifiers=[
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
-        "Programming Language :: Python :: 2",
         "Programming Language :: Python :: 3",
         "Topic :: Software Development :: Libraries"
     ])
@@ -0,0 +1,356 @@
+/*
+ * Optional compiled versions of Python 2.7's hashing algorithms. Results are identical to the pure Python
+ * methods in py27hash/hash.py, which are used when this module isn't built.
+ *
+ * Hash values are computed with unsigned arithmetic at the requested C long width (32 or 64 bits) and converted
+ * to a signed value at the end.
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include <math.h>
+#include <stdint.h>
+
+/* Wraps x to a signed integer of the given width, matching a C long conversion */
+static int64_t
+clong(uint64_t x, int bits)
+{
+    if (bits == 32)
+        return (int64_t)(int32_t)(uint32_t)x;
+
+    return (int64_t)x;
+}
+
+/* Python 2.7 -1 hash value is reserved for errors */
+static int64_t
+result(int64_t x)
+{
+    return x == -1 ? -2 : x;
+}
+
+/*
+ * Logic ported from the 2.7 Python branch: cpython/Objects/stringobject.c
+ * Method: static long string_hash(PyStringObject *a)
+ */
+static int
+string_hash(PyObject *value, int bits, int64_t *out)
+{
+    Py_ssize_t length, i;
+    uint64_t x;
+
+    if (PyUnicode_Check(value)) {
+        int kind;
+        void *data;
+
+#if PY_VERSION_HEX < 0x030C0000
+        if (PyUnicode_READY(value) == -1)
+            return -1;
+#endif
+
+        length = PyUnicode_GET_LENGTH(value);
+        if (length == 0) {
+            *out = 0;
+            return 0;
+        }
+
+        kind = PyUnicode_KIND(value);
+        data = PyUnicode_DATA(value);
+
+        x = (uint64_t)PyUnicode_READ(kind, data, 0) << 7;
+        for (i = 0; i < length; i++)
+            x = (1000003 * x) ^ PyUnicode_READ(kind, data, i);
+    }
+    else if (PyBytes_Check(value)) {
+        const unsigned char *data = (const unsigned char *)PyBytes_AS_STRING(value);
+
+        length = PyBytes_GET_SIZE(value);
+        if (length == 0) {
+            *out = 0;
+            return 0;
+        }
+
+        x = (uint64_t)data[0] << 7;
+        for (i = 0; i < length; i++)
+            x = (1000003 * x) ^ data[i];
+    }
+    else {
+        PyErr_Format(PyExc_TypeError, "expected str or bytes, got '%.200s'", Py_TYPE(value)->tp_name);
+        return -1;
+    }
+
+    x ^= (uint64_t)length;
+
+    *out = result(clong(x, bits));
+    return 0;
+}
+
+/*
+ * Logic ported from the 2.7 Python branch: cpython/Objects/longobject.c
+ * Method: static long long_hash(PyLongObject *v)
+ *
+ * Values that fit in a C long were Python 2.7 ints, which hash to themselves.
+ */
+static int
+long_hash(PyObject *value, int bits, int64_t *out)
+{
+    PyObject *absolute, *modulus, *remainder;
+    long long v;
+    int overflow;
+    uint64_t mask, x;
+
+    v = PyLong_AsLongLongAndOverflow(value, &overflow);
+    if (v == -1 && PyErr_Occurred())
+        return -1;
+
+    /* Word-sized values */
+    if (!overflow && (bits == 64 || (v >= INT32_MIN && v <= INT32_MAX))) {
+        *out = result(v);
+        return 0;
+    }
+
+    mask = bits == 32 ? 0xffffffffULL : 0xffffffffffffffffULL;
+
+    /*
+     * long_hash folds digits with an end-around carry. This leaves the absolute value modulo ULONG_MAX, with
+     * ULONG_MAX in place of 0 for non-zero values.
+     */
+    absolute = PyNumber_Absolute(value);
+    modulus = PyLong_FromUnsignedLongLong(mask);
+    remainder = absolute && modulus ? PyNumber_Remainder(absolute, modulus) : NULL;
+
+    Py_XDECREF(absolute);
+    Py_XDECREF(modulus);
+
+    if (remainder == NULL)
+        return -1;
+
+    x = PyLong_AsUnsignedLongLong(remainder);
+    Py_DECREF(remainder);
+
+    if (x == (uint64_t)-1 && PyErr_Occurred())
+        return -1;
+
+    if (x == 0)
+        x = mask;
+
+    if (overflow ? overflow < 0 : v < 0)
+        x = -x;
+
+    *out = result(clong(x, bits));
+    return 0;
+}
+
+/*
+ * Logic ported from the 2.7 Python branch: cpython/Objects/object.c
+ * Method: long _Py_HashDouble(double v)
+ */
+static int
+double_hash(PyObject *value, int bits, int64_t *out)
+{
+    double v, intpart, fractpart;
+    int expo;
+    int64_t hipart;
+    uint64_t x;
+
+    v = PyFloat_AsDouble(value);
+    if (v == -1.0 && PyErr_Occurred())
+        return -1;
+
+    if (!isfinite(v)) {
+        if (isinf(v))
+            *out = v < 0 ? -271828 : 314159;
+        else
+            *out = 0;
+
+        return 0;
+    }
+
+    fractpart = modf(v, &intpart);
+    if (fractpart == 0.0) {
+        /* Integral values hash the same as an equal int */
+        PyObject *number;
+        int status;
+
+        if (bits == 32 ? fabs(intpart) < 2147483648.0 : fabs(intpart) < 9223372036854775808.0) {
+            *out = result((int64_t)intpart);
+            return 0;
+        }
+
+        number = PyLong_FromDouble(intpart);
+        if (number == NULL)
+            return -1;
+
+        status = long_hash(number, bits, out);
+        Py_DECREF(number);
+
+        return status;
+    }
+
+    v = frexp(v, &expo);
+
+    /* 2**31 */
+    v *= 2147483648.0;
+
+    /* Top 32 bits */
+    hipart = (int64_t)v;
+
+    /* Next 32 bits */
+    v = (v - (double)hipart) * 2147483648.0;
+
+    x = (uint64_t)hipart + (uint64_t)(int64_t)v + ((uint64_t)(int64_t)expo << 15);
+
+    *out = result(clong(x, bits));
+    return 0;
+}
+
+/*
+ * Logic ported from the 2.7 Python branch: cpython/Objects/tupleobject.c
+ * Method: static long tuplehash(PyTupleObject *v)
+ *
+ * Elements that aren't str, bytes, float, int or tuple are hashed with the fallback callable, called as
+ * fallback(element, bits).
+ */
+static int
+tuple_hash(PyObject *value, int bits, PyObject *fallback, int64_t *out)
+{
+    Py_ssize_t length, i;
+    uint64_t x, mult;
+    int64_t y;
+
+    length = PyTuple_GET_SIZE(value);
+
+    mult = 1000003;
+    x = 0x345678;
+
+    for (i = 0; i < PyTuple_GET_SIZE(value); i++) {
+        PyObject *item = PyTuple_GET_ITEM(value, i);
+
+        length--;
+
+        if (PyUnicode_CheckExact(item) || PyBytes_CheckExact(item)) {
+            if (string_hash(item, bits, &y) == -1)
+                return -1;
+        }
+        else if (PyFloat_CheckExact(item)) {
+            if (double_hash(item, bits, &y) == -1)
+                return -1;
+        }
+        else if (PyLong_CheckExact(item)) {
+            if (long_hash(item, bits, &y) == -1)
+                return -1;
+        }
+        else if (PyTuple_CheckExact(item)) {
+            int status;
+
+            if (Py_EnterRecursiveCall(" while hashing a tuple"))
+                return -1;
+
+            status = tuple_hash(item, bits, fallback, &y);
+            Py_LeaveRecursiveCall();
+
+            if (status == -1)
+                return -1;
+        }
+        else {
+            PyObject *h = PyObject_CallFunction(fallback, "Oi", item, bits);
+
+            if (h == NULL)
+                return -1;
+
+            y = PyLong_AsLongLong(h);
+            Py_DECREF(h);
+
+            if (y == -1 && PyErr_Occurred())
+                return -1;
+        }
+
+        x = (x ^ (uint64_t)y) * mult;
+        mult += (uint64_t)(82520 + length + length);
+    }
+
+    x += 97531;
+
+    *out = result(clong(x, bits));
+    return 0;
+}
+
+static int
+check_bits(int bits)
+{
+    if (bits != 32 && bits != 64) {
+        PyErr_Format(PyExc_ValueError, "bits must be 32 or 64, got %d", bits);
+        return -1;
+    }
+
+    return 0;
+}
+
+static PyObject *
+shash(PyObject *self, PyObject *args)
+{
+    PyObject *value;
+    int bits;
+    int64_t h;
+
+    if (!PyArg_ParseTuple(args, "Oi:shash", &value, &bits) || check_bits(bits) == -1)
+        return NULL;
+
+    if (string_hash(value, bits, &h) == -1)
+        return NULL;
+
+    return PyLong_FromLongLong(h);
+}
+
+static PyObject *
+fhash(PyObject *self, PyObject *args)
+{
+    PyObject *value;
+    int bits;
+    int64_t h;
+
+    if (!PyArg_ParseTuple(args, "Oi:fhash", &value, &bits) || check_bits(bits) == -1)
+        return NULL;
+
+    if (double_hash(value, bits, &h) == -1)
+        return NULL;
+
+    return PyLong_FromLongLong(h);
+}
+
+static PyObject *
+thash(PyObject *self, PyObject *args)
+{
+    PyObject *value, *fallback;
+    int bits;
+    int64_t h;
+
+    if (!PyArg_ParseTuple(args, "O!iO:thash", &PyTuple_Type, &value, &bits, &fallback) || check_bits(bits) == -1)
+        return NULL;
+
+    if (tuple_hash(value, bits, fallback, &h) == -1)
+        return NULL;
+
+    return PyLong_FromLongLong(h);
+}
+
+static PyMethodDef methods[] = {
+    {"shash", shash, METH_VARARGS, "shash(value, bits) -> Python 2.7 hash of a str or bytes value"},
+    {"fhash", fhash, METH_VARARGS, "fhash(value, bits) -> Python 2.7 hash of a float"},
+    {"thash", thash, METH_VARARGS, "thash(value, bits, fallback) -> Python 2.7 hash of a tuple"},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT,
+    "_hash",
+    "Compiled Python 2.7 hashing algorithms",
+    -1,
+    methods
+};
+
+PyMODINIT_FUNC
+PyInit__hash(void)
+{
+    return PyModule_Create(&module);
+}
@@ -4,14 +4,29 @@ Compatibility methods to support Python 2.7 style dicts in Python 3.X+
 This is designed for compatibility not performance.
 """
 
+import io
+
 # pylint: disable = E0401
+from .hash import Hash
 from .key import Keys
+from .text import Text
+from .view import ItemsView, KeysView, ValuesView
 
 class Dict(dict):
     """
     Compatibility class to support Python 2.7 style iteration in Python 3.X+
+
+    The bits and sizebits attributes set the C long and size_t sizes used for hashing and probing. Subclasses can
+    set these to reproduce iteration order from 32-bit or Windows Python 2.7 builds. Defaults to the current platform.
+
+    Keys must have a Python 2.7 hash. Keys that don't, such as None which Python 2.7 hashes by memory address, raise
+    a TypeError before the Dict is changed.
     """
 
+    # C long and size_t sizes in bits
+    bits = None
+    sizebits = None
+
     def __init__(self, *args, **kwargs):
         """
         Overrides dict logic to always call set item. This allows Python 2.7 style iteration.
@@ -24,7 +39,7 @@ class Dict(dict):
         super(Dict, self).__init__()
 
         # Initialize iteration key list
-        self.keylist = Keys()
+        self.keylist = Keys(self.bits, self.sizebits)
 
         # Initialize base arguments
         self.update(*args, **kwargs)
@@ -46,9 +61,13 @@ class Dict(dict):
             value: value
         """
 
+        # Hash new keys first, so keys without a Python 2.7 hash are rejected before anything changes
+        h = None if key in self else Hash.hash(key, self.keylist.bits)
+
         super(Dict, self).__setitem__(key, value)
 
-        self.keylist.add(key)
+        if h is not None:
+            self.keylist.add(key, h)
 
     def __delitem__(self, key):
         """
@@ -64,7 +83,9 @@ class Dict(dict):
 
     def update(self, *args, **kwargs):
         """
-        Overrides dict logic to always call set item. This allows Python 2.7 style iteration.
+        Overrides dict logic to track keys in bulk. This allows Python 2.7 style iteration.
+
+        Method: static int dict_update_common(PyObject *self, PyObject *args, PyObject *kwds, char *methname)
 
         Args:
             *args: args
@@ -72,18 +93,88 @@ class Dict(dict):
         """
 
         for arg in args:
-            # Cast to dict if applicable. Otherwise, assume it's an iterable of (key, value) pairs.
-            if isinstance(arg, dict):
-                # Merge incoming keys into keylist
-                self.keylist.merge(arg.keys())
+            if isinstance(arg, Dict):
+                # Merge incoming keys into keylist, reusing cached hashes
+                self.keylist.merge(arg.keylist)
+
+                super(Dict, self).update(dict.items(arg))
+            elif isinstance(arg, dict):
+                # Dicts are merged with a single presize
+                self.insert(list(arg.items()), True)
+            elif hasattr(arg, "keys"):
+                # Other mappings add keys one by one
+                self.insert([(k, arg[k]) for k in arg.keys()])
+            else:
+                # Iterable of (key, value) pairs
+                self.insert([(k, v) for k, v in arg])
+
+        if kwargs:
+            # Python 2.7 collects keyword arguments into a dict in reverse call order, then merges it
+            keys = Keys(self.bits, self.sizebits)
+            keys.extend(list(kwargs)[::-1])
+            self.keylist.merge(keys)
+
+            super(Dict, self).update(kwargs)
+
+    def insert(self, items, merge=False):
+        """
+        Adds a batch of (key, value) items. Keys are hashed before anything changes. If a key can't be hashed, the
+        items before it are still added to both the backing dict and keylist, the same as Python 2.7, and the error
+        is raised.
+
+        Args:
+            items: list of (key, value) items
+            merge: presizes once like PyDict_Merge if True, otherwise keys are added one at a time
+        """
+
+        keys = [k for k, _ in items]
+        hashes, error = self.keylist.prefix(keys)
+
+        if error:
+            items, keys = items[:len(hashes)], keys[:len(hashes)]
+
+        super(Dict, self).update(items)
+
+        if merge:
+            self.keylist.merge(keys, hashes)
+        else:
+            self.keylist.extend(keys, hashes)
+
+        if error:
+            raise error
+
+    @classmethod
+    def fromkeys(cls, iterable, value=None):
+        """
+        Creates a new Dict with keys from iterable and values set to value.
+
+        Method: static PyObject *dict_fromkeys(PyObject *cls, PyObject *args)
 
-                arg = arg.items()
+        Args:
+            iterable: keys
+            value: value for each key
+
+        Returns:
+            Dict
+        """
+
+        d = cls()
 
-            for k, v in arg:
-                self[k] = v
+        if isinstance(iterable, (dict, set, frozenset)):
+            # Dicts and sets presize to 1.5x the number of keys and insert without further resizing
+            d.keylist.resize(len(iterable) // 2 * 3)
 
-        for k, v in dict(**kwargs).items():
-            self[k] = v
+            keys = getattr(iterable, "keylist", None)
+            if isinstance(keys, Keys) and keys.bits == d.keylist.bits:
+                d.keylist.extend(*keys.entries(), grow=False)
+            else:
+                d.keylist.extend(list(iterable), grow=False)
+        else:
+            d.keylist.extend(list(iterable))
+
+        super(Dict, d).update((k, value) for k in d.keylist)
+
+        return d
 
     def clear(self):
         """
@@ -92,7 +183,7 @@ class Dict(dict):
 
         super(Dict, self).clear()
 
-        self.keylist = Keys()
+        self.keylist = Keys(self.bits, self.sizebits)
 
     def copy(self):
         """
@@ -102,14 +193,13 @@ class Dict(dict):
             copy of self
         """
 
-        new = Dict()
+        new = self.__class__()
 
-        # First copy the keylist to the new object
+        # First copy the keylist to the new object, the table is shared until either side changes
         new.keylist = self.keylist.copy()
 
         # Copy keys into backing dict
-        for (k, v) in self.items():
-            new[k] = v
+        super(Dict, new).update(dict.items(self))
 
         return new
 
@@ -125,7 +215,11 @@ class Dict(dict):
             value of key if found or default
         """
 
-        value = super(Dict, self).pop(key, default)
+        # Missing keys leave the keylist unchanged
+        if key not in self:
+            return default
+
+        value = super(Dict, self).pop(key)
         self.keylist.remove(key)
 
         return value
@@ -140,7 +234,7 @@ class Dict(dict):
 
         if self:
             key = self.keylist.pop()
-            value = self[key] if key else None
+            value = self[key]
 
             del self[key]
 
@@ -160,21 +254,16 @@ class Dict(dict):
 
     def __str__(self):
         """
-        Creates a string version of this Dict.
+        Creates a string version of this Dict. Matches repr strings from Python 2.7.
 
         Returns:
             string
         """
 
-        string = "{"
+        fp = io.StringIO()
+        self.write_repr(fp)
 
-        for x, k in enumerate(self):
-            string += ", " if x > 0 else ""
-            string += "'%s': %s" % (k, self[k])
-
-        string += "}"
-
-        return string
+        return fp.getvalue()
 
     def __repr__(self):
         """
@@ -186,6 +275,17 @@ class Dict(dict):
 
         return self.__str__()
 
+    def write_repr(self, fp):
+        """
+        Writes the Python 2.7 repr string of this Dict to a text stream. Output is written in chunks as it's
+        generated.
+
+        Args:
+            fp: text stream, any object with a write method
+        """
+
+        Text(fp, self.bits).write(self)
+
     def keys(self):
         """
         Returns keys ordered using Python 2.7's iteration algorithm.
@@ -204,7 +304,7 @@ class Dict(dict):
           list of values
         """
 
-        return [self[k] for k in self.keys()]
+        return list(map(self.__getitem__, self.keylist))
 
     def items(self):
         """
@@ -214,7 +314,8 @@ class Dict(dict):
           list of items
         """
 
-        return [(k, self[k]) for k in self.keys()]
+        keys = self.keys()
+        return list(zip(keys, map(self.__getitem__, keys)))
 
     # Backwards compat methods removed in Python 3.X
     def has_key(self, key):
@@ -235,57 +336,60 @@ class Dict(dict):
         Backwards compat method for Python 2 dict
 
         Returns:
-            keys
+            dynamic view of keys
         """
 
-        return self.keys()
+        return KeysView(self)
 
     def viewvalues(self):
         """
         Backwards compat method for Python 2 dict
 
         Returns:
-            values
+            dynamic view of values
         """
 
-        return self.values()
+        return ValuesView(self)
 
     def viewitems(self):
         """
         Backwards compat method for Python 2 dict
 
         Returns:
-            items
+            dynamic view of items
         """
 
-        return self.items()
+        return ItemsView(self)
 
     def iterkeys(self):
         """
         Backwards compat method for Python 2 dict
 
         Returns:
-            iter(keys)
+            iterator over keys
         """
 
-        return iter(self.keys())
+        return iter(self.keylist)
 
     def itervalues(self):
         """
         Backwards compat method for Python 2 dict
 
         Returns:
-            iter(values)
+            iterator over values
         """
 
-        return iter(self.values())
+        # Values are fetched from the backing dict with a C level lookup per key
+        return map(self.__getitem__, self.keylist)
 
     def iteritems(self):
         """
         Backwards compat method for Python 2 dict
 
         Returns:
-            iter(items)
+            iterator over items
         """
 
-        return iter(self.items())
+        get = self.__getitem__
+
+        return ((k, get(k)) for k in self.keylist)
@@ -0,0 +1,150 @@
+"""
+Compatibility methods to support immutable Python 2.7 style dicts in Python 3.X+
+
+This is designed for compatibility not performance.
+"""
+
+# pylint: disable = E0401
+from .dict import Dict
+from .hash import Hash, BITS
+from .key import Keys
+
+class FrozenDict(Dict):
+    """
+    Immutable Dict with Python 2.7 iteration order. Iteration order is computed once at construction and the hash is
+    computed once and cached, so FrozenDicts can be used as keys in a Dict or Set and as tuple elements.
+
+    Python 2.7 dicts aren't hashable. A FrozenDict hashes the same as a frozenset of its (key, value) items.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Creates a new FrozenDict.
+
+        Args:
+            *args: args
+            *kwargs: keyword args
+        """
+
+        # pylint: disable = W0231,W0233
+        dict.__init__(self)
+
+        self.keylist = Keys(self.bits, self.sizebits)
+        Dict.update(self, *args, **kwargs)
+
+        self.freeze()
+
+    def __setstate__(self, state):
+        """
+        Restores a pickled FrozenDict. Iteration order follows the deserialized keylist.
+
+        Args:
+            state: input state
+        """
+
+        self.__dict__.update(state)
+        self.freeze()
+
+    def __hash__(self):
+        """
+        Python 3 hash, same as a frozenset of the (key, value) items.
+
+        Returns:
+            hash
+        """
+
+        if self.hashcode is None:
+            self.hashcode = hash(frozenset(dict.items(self)))
+
+        return self.hashcode
+
+    def __iter__(self):
+        """
+        Iterates over keys in Python 2.7 order.
+
+        Returns:
+            iterator
+        """
+
+        return iter(self.order)
+
+    def freeze(self):
+        """
+        Precomputes iteration order and resets hash caches.
+        """
+
+        self.order = tuple(self.keylist)
+        self.hashcode, self.hashes = None, {}
+
+    def immutable(self, *args, **kwargs):
+        """
+        Raises an error for methods that modify a Dict.
+
+        Args:
+            *args: args
+            *kwargs: keyword args
+        """
+
+        raise TypeError("'%s' object is immutable" % type(self).__name__)
+
+    # Methods that modify a Dict aren't supported. This includes dict methods that Dict doesn't override, which would
+    # otherwise modify the underlying dict without updating the keylist.
+    __setitem__ = __delitem__ = __ior__ = update = clear = pop = popitem = setdefault = immutable
+
+    @classmethod
+    def fromkeys(cls, iterable, value=None):
+        """
+        Creates a new FrozenDict with keys from iterable and values set to value.
+
+        Args:
+            iterable: keys
+            value: value for each key
+
+        Returns:
+            FrozenDict
+        """
+
+        # Keys are laid out the same way as Dict.fromkeys, then order is computed
+        d = super(FrozenDict, cls).fromkeys(iterable, value)
+        d.freeze()
+
+        return d
+
+    def copy(self):
+        """
+        FrozenDicts are immutable, copies return self.
+
+        Returns:
+            self
+        """
+
+        return self
+
+    def keys(self):
+        """
+        Returns keys ordered using Python 2.7's iteration algorithm.
+
+        Returns:
+          list of keys
+        """
+
+        return list(self.order)
+
+    def hash27(self, bits=None):
+        """
+        Returns the Python 2.7 hash of this FrozenDict, hashed as a frozenset of the (key, value) items. The hash is
+        computed once and cached.
+
+        Args:
+            bits: C long size in bits, defaults to the bits attribute
+
+        Returns:
+            Python 2.7 hash
+        """
+
+        bits = bits if bits else (self.bits if self.bits else BITS)
+
+        if bits not in self.hashes:
+            self.hashes[bits] = Hash.sethash([(k, self[k]) for k in self.order], bits)
+
+        return self.hashes[bits]
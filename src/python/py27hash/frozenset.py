@@ -0,0 +1,367 @@
+"""
+Compatibility methods to support Python 2.7 style frozensets in Python 3.X+
+
+This is designed for compatibility not performance.
+"""
+
+# pylint: disable = E0401
+from .hash import Hash, BITS
+from .key import Keys
+from .set import Set
+from .text import repr27
+
+class FrozenSet(frozenset):
+    """
+    Immutable set with Python 2.7 iteration order. Iteration order is computed once at construction and the Python
+    2.7 hash is computed once and cached, so FrozenSets can be used as keys in a Dict or Set and as tuple elements.
+
+    The bits and sizebits attributes set the C long and size_t sizes used for hashing and probing. Subclasses can
+    set these to reproduce iteration order from 32-bit or Windows Python 2.7 builds. Defaults to the current platform.
+    """
+
+    # C long and size_t sizes in bits
+    bits = None
+    sizebits = None
+
+    # Set types with the same C long and size_t sizes, used to compute set algebra results
+    SETS = {}
+
+    def __new__(cls, iterable=()):
+        """
+        Creates a new FrozenSet. FrozenSets of the same type are immutable, so they are returned as is.
+
+        Method: static PyObject *frozenset_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+
+        Args:
+            iterable: elements
+
+        Returns:
+            FrozenSet
+        """
+
+        # Only instances of exactly this type are reused, similar to PyFrozenSet_CheckExact
+        # pylint: disable = C0123
+        if type(iterable) is cls:
+            return iterable
+
+        # Iterators can only be consumed once
+        if not isinstance(iterable, (set, frozenset, dict, list, tuple)):
+            iterable = list(iterable)
+
+        self = super(FrozenSet, cls).__new__(cls, iterable)
+
+        self.keylist = Keys(cls.bits, cls.sizebits)
+
+        # Sets and dicts are merged in, reusing cached hashes when available
+        keys = getattr(iterable, "keylist", None)
+        if isinstance(iterable, (set, frozenset)) or Set.mapping(iterable):
+            self.keylist.merge(keys if isinstance(keys, Keys) else iterable)
+        else:
+            self.keylist.extend(iterable)
+
+        # Precomputed iteration order and Python 2.7 hash cache per C long size
+        self.order = tuple(self.keylist)
+        self.hashes = {}
+
+        return self
+
+    def __reduce__(self):
+        """
+        Pickles elements in Python 2.7 iteration order, which matches Python 2.7 deserialization logic.
+
+        Returns:
+            reduce tuple
+        """
+
+        return (self.__class__, (list(self.order),))
+
+    def __iter__(self):
+        """
+        Iterates over elements in Python 2.7 order.
+
+        Returns:
+            iterator
+        """
+
+        return iter(self.order)
+
+    def __str__(self):
+        """
+        Creates a string version of this FrozenSet. Matches repr strings from Python 2.7.
+
+        Returns:
+            string
+        """
+
+        return repr27(self, self.bits)
+
+    def __repr__(self):
+        """
+        Creates a string version of this FrozenSet.
+
+        Returns:
+            string
+        """
+
+        return self.__str__()
+
+    def union(self, *others):
+        """
+        Elements in this FrozenSet or any of the others.
+
+        Method: static PyObject *set_union(PySetObject *so, PyObject *args)
+
+        Args:
+            others: iterables
+
+        Returns:
+            FrozenSet
+        """
+
+        result = self.thaw()
+        return self.frozen(result.union(*self.operands(result, others)))
+
+    def intersection(self, *others):
+        """
+        Elements in this FrozenSet and all of the others.
+
+        Method: static PyObject *set_intersection_multi(PySetObject *so, PyObject *args)
+
+        Args:
+            others: iterables
+
+        Returns:
+            FrozenSet
+        """
+
+        result = self.thaw()
+        return self.frozen(result.intersection(*self.operands(result, others)))
+
+    def difference(self, *others):
+        """
+        Elements in this FrozenSet that aren't in any of the others.
+
+        Method: static PyObject *set_difference_multi(PySetObject *so, PyObject *args)
+
+        Args:
+            others: iterables
+
+        Returns:
+            FrozenSet
+        """
+
+        result = self.thaw()
+        return self.frozen(result.difference(*self.operands(result, others)))
+
+    def symmetric_difference(self, other):
+        """
+        Elements in either this FrozenSet or other but not both.
+
+        Method: static PyObject *set_symmetric_difference(PySetObject *so, PyObject *other)
+
+        Args:
+            other: iterable
+
+        Returns:
+            FrozenSet
+        """
+
+        result = self.thaw()
+        return self.frozen(result.symmetric_difference(*self.operands(result, (other,))))
+
+    def __or__(self, other):
+        """
+        Elements in this FrozenSet or other.
+
+        Args:
+            other: set
+
+        Returns:
+            FrozenSet
+        """
+
+        result = self.thaw()
+        return self.frozen(result.__or__(*self.operands(result, (other,))))
+
+    def __ror__(self, other):
+        """
+        Elements in other or this FrozenSet.
+
+        Args:
+            other: set
+
+        Returns:
+            FrozenSet
+        """
+
+        return self.frozen(self.thaw().__ror__(other))
+
+    def __and__(self, other):
+        """
+        Elements in both this FrozenSet and other.
+
+        Args:
+            other: set
+
+        Returns:
+            FrozenSet
+        """
+
+        result = self.thaw()
+        return self.frozen(result.__and__(*self.operands(result, (other,))))
+
+    def __rand__(self, other):
+        """
+        Elements in both other and this FrozenSet.
+
+        Args:
+            other: set
+
+        Returns:
+            FrozenSet
+        """
+
+        return self.frozen(self.thaw().__rand__(other))
+
+    def __sub__(self, other):
+        """
+        Elements in this FrozenSet that aren't in other.
+
+        Args:
+            other: set
+
+        Returns:
+            FrozenSet
+        """
+
+        result = self.thaw()
+        return self.frozen(result.__sub__(*self.operands(result, (other,))))
+
+    def __rsub__(self, other):
+        """
+        Elements in other that aren't in this FrozenSet.
+
+        Args:
+            other: set
+
+        Returns:
+            FrozenSet
+        """
+
+        return self.frozen(self.thaw().__rsub__(other))
+
+    def __xor__(self, other):
+        """
+        Elements in either this FrozenSet or other but not both.
+
+        Args:
+            other: set
+
+        Returns:
+            FrozenSet
+        """
+
+        result = self.thaw()
+        return self.frozen(result.__xor__(*self.operands(result, (other,))))
+
+    def __rxor__(self, other):
+        """
+        Elements in either other or this FrozenSet but not both.
+
+        Args:
+            other: set
+
+        Returns:
+            FrozenSet
+        """
+
+        return self.frozen(self.thaw().__rxor__(other))
+
+    def thaw(self):
+        """
+        Creates a Set with the same C long and size_t sizes that shares this FrozenSet's layout. Python 2.7 runs the
+        same algebra for sets and frozensets, so results are computed with Set logic.
+
+        Returns:
+            Set
+        """
+
+        bits, sizebits = self.bits, self.sizebits
+        if (bits, sizebits) not in FrozenSet.SETS:
+            kind = Set if (bits, sizebits) == (Set.bits, Set.sizebits) else type("Set", (Set,), {"bits": bits, "sizebits": sizebits})
+            FrozenSet.SETS[(bits, sizebits)] = kind
+
+        result = FrozenSet.SETS[(bits, sizebits)]()
+
+        # Keys are never modified, so the table is shared as is
+        result.keylist = self.keylist.share()
+        set.update(result, self)
+
+        return result
+
+    def operands(self, result, others):
+        """
+        Swaps this FrozenSet for its thawed Set in a list of operands, so operations on self follow the same logic
+        as Python 2.7.
+
+        Args:
+            result: thawed Set
+            others: operands
+
+        Returns:
+            list of operands
+        """
+
+        return [result if other is self else other for other in others]
+
+    def frozen(self, result):
+        """
+        Creates a new FrozenSet of the same type that takes the layout of a Set result.
+
+        Args:
+            result: Set or NotImplemented
+
+        Returns:
+            FrozenSet or NotImplemented
+        """
+
+        if result is NotImplemented:
+            return result
+
+        frozen = frozenset.__new__(self.__class__, result)
+        frozen.keylist = result.keylist
+
+        frozen.order = tuple(frozen.keylist)
+        frozen.hashes = {}
+
+        return frozen
+
+    def copy(self):
+        """
+        FrozenSets are immutable, copies return self.
+
+        Returns:
+            self
+        """
+
+        return self
+
+    def hash27(self, bits=None):
+        """
+        Returns the Python 2.7 hash of this FrozenSet. The hash is computed once and cached.
+
+        Args:
+            bits: C long size in bits, defaults to the bits attribute
+
+        Returns:
+            Python 2.7 hash
+        """
+
+        bits = bits if bits else (self.bits if self.bits else BITS)
+
+        if bits not in self.hashes:
+            # Cached element hashes are only valid for the same C long size
+            hashes = self.keylist.entries()[1] if bits == (self.bits if self.bits else BITS) else None
+            self.hashes[bits] = Hash.sethash(self.order, bits, hashes)
+
+        return self.hashes[bits]
@@ -4,52 +4,509 @@ Compatibility methods to support Python 2.7 style hashing in Python 3.X+
 This is designed for compatibility not performance.
 """
 
-import ctypes
+import functools
 import math
+import os
+import struct
 
-def hash27(value):
+from array import array
+from collections import deque
+from itertools import islice
+
+# Optional compiled hash functions
+try:
+    # pylint: disable = E0611
+    from . import _hash as native
+except ImportError:
+    native = None
+
+# Size of a C long in bits
+BITS = struct.calcsize("l") * 8
+
+# Size of a C size_t in bits
+SIZEBITS = struct.calcsize("P") * 8
+
+# Masks used to convert values to C long/size_t types
+MASK = (1 << BITS) - 1
+SIGN = 1 << (BITS - 1)
+SIZEMASK = (1 << SIZEBITS) - 1
+
+# (mask, sign) for each supported C long width
+MASKS = {32: (0xffffffff, 0x80000000), 64: (0xffffffffffffffff, 0x8000000000000000)}
+
+def hash27(value, bits=None):
     """
     Wrapper call to Hash.hash()
 
     Args:
         value: input value
+        bits: C long size in bits (32 or 64), defaults to the current platform
 
     Returns:
         Python 2.7 hash
     """
 
-    return Hash.hash(value)
+    return Hash.hash(value, bits)
+
+def hash27_many(values, bits=None):
+    """
+    Wrapper call to Hash.hashes()
+
+    Args:
+        values: sequence or NumPy array of values
+        bits: C long size in bits (32 or 64), defaults to the current platform
+
+    Returns:
+        NumPy int64 array of Python 2.7 hashes
+    """
+
+    return Hash.hashes(values, bits)
+
+def hash27_parallel(values, bits=None, workers=None, chunksize=10000):
+    """
+    Wrapper call to Hash.parallel()
+
+    Args:
+        values: iterable of values
+        bits: C long size in bits (32 or 64), defaults to the current platform
+        workers: number of worker processes, defaults to the number of CPUs
+        chunksize: number of values sent to a worker at a time
+
+    Returns:
+        iterator of Python 2.7 hashes in input order
+    """
+
+    return Hash.parallel(values, bits, workers, chunksize)
 
 class Hash(object):
     """
     Various hashing methods using Python 2.7's algorithms
+
+    All methods take an optional bits argument with the size of a C long, either 32 or 64. This allows reproducing
+    hashes from 32-bit Python 2.7 builds and Windows builds, where a C long is 32 bits. The default is the size of
+    a C long on the current platform.
     """
 
+    # Number of rows hashed at a time by vectorized string hashing
+    BLOCK = 16384
+
+    # Registered hash methods by type, see Hash.register
+    TYPES = {}
+
+    # Resolved hash methods by exact type, including subclasses of registered types
+    CACHE = {}
+
+    # Memoized hash method for string types, see Hash.memoize
+    MEMO = None
+
+    # Default hash methods for built-in types. Compiled tuple hashing and vectorized batch hashing handle these types
+    # directly, so they're only used while STANDARD is True, i.e. none of these methods have been replaced.
+    DEFAULTS = {}
+    STANDARD = True
+
+    # Types that can be memoized. These are immutable and their equality matches their Python 2.7 hash.
+    STRINGS = (str, bytes)
+
     @staticmethod
-    def hash(value):
+    def hash(value, bits=None):
         """
         Returns a Python 2.7 hash for a value.
 
         Args:
             value: input value
+            bits: C long size in bits
 
         Returns:
             Python 2.7 hash
         """
 
-        if isinstance(value, tuple):
-            return Hash.thash(value)
-        if isinstance(value, float):
-            return Hash.fhash(value)
-        if isinstance(value, int):
-            return hash(value)
-        if isinstance(value, ("".__class__, u"".__class__, bytes)) or type(value).__name__ == "buffer":
-            return Hash.shash(value)
+        method = Hash.CACHE.get(type(value))
+        if method is None:
+            method = Hash.resolve(type(value))
 
-        raise TypeError("unhashable type: '%s'" % (type(value).__name__))
+        return method(value, bits)
 
     @staticmethod
-    def thash(value):
+    def register(kind, method):
+        """
+        Registers a Python 2.7 hash method for a type. The method is also used for subclasses, unless a subclass has
+        its own registered method or a hash27 method.
+
+        Args:
+            kind: type
+            method: callable, called as method(value, bits), that returns a Python 2.7 hash
+        """
+
+        Hash.TYPES[kind] = method
+
+        # Subclass lookups may have changed and memoized hashes may have come from the previous method
+        Hash.CACHE.clear()
+        Hash.STANDARD = all(Hash.TYPES.get(base) is default for base, default in Hash.DEFAULTS.items())
+        if Hash.MEMO:
+            Hash.MEMO.cache_clear()
+
+    @staticmethod
+    def resolve(kind):
+        """
+        Finds the hash method for a type and caches it. Lookup order is the type itself, a hash27 method and then
+        the closest registered base class.
+
+        Args:
+            kind: type
+
+        Returns:
+            hash method
+        """
+
+        # Memoized exact string types. Subclasses can override equality, so they aren't memoized.
+        method = Hash.MEMO if Hash.MEMO and kind in Hash.STRINGS else Hash.TYPES.get(kind)
+
+        if method is None and hasattr(kind, "hash27"):
+            # Frozen containers compute their hash once and cache it
+            method = Hash.custom
+
+        if method is None:
+            method = next((Hash.TYPES[base] for base in kind.__mro__[1:] if base in Hash.TYPES), None)
+
+        if method is None:
+            raise TypeError("unhashable type: '%s'" % (kind.__name__))
+
+        Hash.CACHE[kind] = method
+
+        return method
+
+    @staticmethod
+    def memoize(size=65536):
+        """
+        Enables a process-wide memo cache of str and bytes hashes, replacing any existing cache. Entries are evicted
+        in least recently used order once the cache has size entries. The cache is thread-safe. Setting size to 0
+        disables the cache.
+
+        This helps when the same strings are hashed repeatedly across many Dicts and hash27 calls.
+
+        Args:
+            size: maximum number of cached hashes
+        """
+
+        Hash.MEMO = None
+        if size:
+            Hash.MEMO = functools.lru_cache(maxsize=size)(Hash.registered)
+
+        # Resolve string types again
+        Hash.CACHE.clear()
+
+    @staticmethod
+    def memoinfo():
+        """
+        Returns memo cache statistics.
+
+        Returns:
+            (hits, misses, maxsize, currsize) named tuple or None if the cache isn't enabled
+        """
+
+        return Hash.MEMO.cache_info() if Hash.MEMO else None
+
+    @staticmethod
+    def registered(value, bits=None):
+        """
+        Returns the Python 2.7 hash for a value using the method registered for its exact type.
+
+        Args:
+            value: input value
+            bits: C long size in bits
+
+        Returns:
+            Python 2.7 hash
+        """
+
+        return Hash.TYPES[type(value)](value, bits)
+
+    @staticmethod
+    def custom(value, bits=None):
+        """
+        Returns the Python 2.7 hash for a value with a hash27 method.
+
+        Args:
+            value: input value
+            bits: C long size in bits
+
+        Returns:
+            Python 2.7 hash
+        """
+
+        return value.hash27(bits)
+
+    @staticmethod
+    def hashes(values, bits=None):
+        """
+        Returns Python 2.7 hashes for a batch of values. Requires NumPy.
+
+        Batches of str, bytes, int or float values are hashed with vectorized NumPy operations. Fixed-width string
+        arrays are hashed one character column at a time. Mixed batches fall back to Hash.hash per value.
+
+        Args:
+            values: sequence or NumPy array of values
+            bits: C long size in bits
+
+        Returns:
+            NumPy int64 array of Python 2.7 hashes
+        """
+
+        # pylint: disable = C0415
+        import numpy as np
+
+        # Vectorized versions are only used with the default methods for built-in types
+        if not Hash.STANDARD:
+            values = values.tolist() if isinstance(values, np.ndarray) else values
+            return np.fromiter((Hash.hash(x, bits) for x in values), dtype=np.int64)
+
+        if not isinstance(values, np.ndarray):
+            values = values if isinstance(values, (list, tuple)) else list(values)
+            types = set(map(type, values))
+
+            if types in ({str}, {bytes}):
+                # Use actual lengths, NumPy strips trailing null characters which still need to be hashed
+                lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+                return Hash.sarray(np.array(values), lengths, bits)
+            if types == {float}:
+                return Hash.farray(np.array(values, dtype=np.float64), bits)
+            if types == {int}:
+                return Hash.iarray(np.array(values, dtype=object), bits)
+
+            return np.fromiter((Hash.hash(x, bits) for x in values), dtype=np.int64, count=len(values))
+
+        if values.dtype.kind in "US":
+            return Hash.sarray(values, bits=bits)
+        if values.dtype.kind == "f":
+            return Hash.farray(values, bits)
+        if values.dtype.kind in "iu":
+            return Hash.iarray(values, bits)
+
+        return np.fromiter((Hash.hash(x, bits) for x in values.tolist()), dtype=np.int64, count=values.size)
+
+    @staticmethod
+    def parallel(values, bits=None, workers=None, chunksize=10000):
+        """
+        Returns Python 2.7 hashes for a large stream of values using a process pool. Values are read in chunks and
+        at most two chunks per worker are in flight at a time, so memory use is bounded for any input size. Hashes
+        are yielded in input order as chunks complete.
+
+        The pool is shut down when the iterator is exhausted, closed or garbage collected. Chunks that haven't
+        started are cancelled.
+
+        Args:
+            values: iterable of values
+            bits: C long size in bits
+            workers: number of worker processes, defaults to the number of CPUs
+            chunksize: number of values sent to a worker at a time
+
+        Returns:
+            iterator of Python 2.7 hashes
+        """
+
+        # pylint: disable = C0415
+        from concurrent.futures import ProcessPoolExecutor
+
+        values, workers = iter(values), workers if workers else (os.cpu_count() or 1)
+
+        executor, pending = ProcessPoolExecutor(workers), deque()
+        try:
+            while True:
+                # Keep workers busy while results are consumed
+                while len(pending) < workers * 2:
+                    chunk = list(islice(values, chunksize))
+                    if not chunk:
+                        break
+
+                    pending.append(executor.submit(Hash.batch, chunk, bits))
+
+                if not pending:
+                    break
+
+                for x in pending.popleft().result():
+                    yield x
+        finally:
+            for future in pending:
+                future.cancel()
+
+            executor.shutdown(wait=True)
+
+    @staticmethod
+    def batch(values, bits=None):
+        """
+        Hashes a chunk of values in a worker process.
+
+        Args:
+            values: list of values
+            bits: C long size in bits
+
+        Returns:
+            array of Python 2.7 hashes
+        """
+
+        return array("q", [Hash.hash(x, bits) for x in values])
+
+    @staticmethod
+    def sarray(values, lengths=None, bits=None):
+        """
+        Vectorized version of Hash.shash for a fixed-width str or bytes NumPy array.
+
+        Args:
+            values: NumPy array with a str or bytes dtype
+            lengths: optional array of string lengths, derived from values if not provided
+            bits: C long size in bits
+
+        Returns:
+            NumPy int64 array of Python 2.7 hashes
+        """
+
+        # pylint: disable = C0415
+        import numpy as np
+
+        # Character codes, one column per character position
+        width = values.dtype.itemsize // (4 if values.dtype.kind == "U" else 1)
+        codes = np.ascontiguousarray(values).reshape(-1).view(np.uint32 if values.dtype.kind == "U" else np.uint8)
+        codes = codes.reshape(-1, width)
+
+        if lengths is None:
+            # Position of last non-null character + 1
+            nonzero = codes != 0
+            lengths = np.where(nonzero.any(axis=1), width - np.argmax(nonzero[:, ::-1], axis=1), 0)
+
+        # Padding characters are 0, so they only multiply x by 1000003 once per position past the end of a string.
+        # Undo the extra multiplications with powers of the inverse of 1000003 mod 2**64.
+        inverse = pow(1000003, (1 << 63) - 1, 1 << 64)
+        powers = np.array([pow(inverse, n, 1 << 64) for n in range(width + 1)], dtype=np.uint64)
+
+        x = np.zeros(len(codes), dtype=np.uint64)
+
+        # Process rows in blocks, transposing each block so every character position is contiguous
+        for start in range(0, len(codes) if width else 0, Hash.BLOCK):
+            block = x[start:start + Hash.BLOCK]
+            columns = codes[start:start + Hash.BLOCK].T.astype(np.uint64)
+
+            block[:] = columns[0] << np.uint64(7)
+            for column in columns:
+                block *= np.uint64(1000003)
+                block ^= column
+
+        x *= powers[width - lengths]
+        x ^= lengths.astype(np.uint64)
+
+        # Empty strings hash to 0
+        x[lengths == 0] = 0
+
+        return Hash.carray(x, bits)
+
+    @staticmethod
+    def farray(values, bits=None):
+        """
+        Vectorized version of Hash.fhash for a NumPy float array. Integral values fall back to Hash.fhash.
+
+        Args:
+            values: NumPy float array
+            bits: C long size in bits
+
+        Returns:
+            NumPy int64 array of Python 2.7 hashes
+        """
+
+        # pylint: disable = C0415
+        import numpy as np
+
+        values = values.reshape(-1).astype(np.float64)
+        fraction = np.modf(values)[0]
+
+        # Finite values with a fractional part. NaN and inf are masked before conversion to integers.
+        fractional = (fraction != 0.0) & np.isfinite(values)
+        v, e = np.frexp(np.where(fractional, values, 0.5))
+
+        # 2**31
+        v *= 2147483648.0
+
+        # Top 32 bits
+        hipart = np.trunc(v)
+
+        # Next 32 bits
+        v = (v - hipart) * 2147483648.0
+
+        x = hipart.astype(np.int64).view(np.uint64) + np.trunc(v).astype(np.int64).view(np.uint64)
+        x += e.astype(np.int64).view(np.uint64) << np.uint64(15)
+
+        x = Hash.carray(x, bits)
+
+        # Integral values hash as ints, NaN and inf have fixed hashes
+        other = np.flatnonzero(~fractional)
+        x[other] = [Hash.fhash(float(y), bits) for y in values[other]]
+
+        return x
+
+    @staticmethod
+    def iarray(values, bits=None):
+        """
+        Vectorized version of Hash.lhash for a NumPy integer array. Values outside the C long range fall back to
+        Hash.lhash.
+
+        Args:
+            values: NumPy integer or object array of ints
+            bits: C long size in bits
+
+        Returns:
+            NumPy int64 array of Python 2.7 hashes
+        """
+
+        # pylint: disable = C0415
+        import numpy as np
+
+        values = values.reshape(-1)
+
+        # Values that fit in a C long hash to themselves
+        sign = MASKS[bits][1] if bits else SIGN
+        if values.dtype.kind == "O":
+            small = np.fromiter((-sign <= y < sign for y in values), dtype=bool, count=values.size)
+        else:
+            # Clip bounds to the array type
+            info = np.iinfo(values.dtype)
+            small = (values >= max(-sign, info.min)) & (values <= min(sign - 1, info.max))
+
+        x = np.zeros(values.size, dtype=np.int64)
+        x[small] = values[small].astype(np.int64)
+        x[x == -1] = -2
+
+        large = np.flatnonzero(~small)
+        x[large] = [Hash.lhash(int(y), bits) for y in values[large]]
+
+        return x
+
+    @staticmethod
+    def carray(x, bits=None):
+        """
+        Converts a NumPy uint64 array to signed C long values. This is the vectorized version of the C long
+        conversion at the end of each hash method.
+
+        Args:
+            x: NumPy uint64 array
+            bits: C long size in bits
+
+        Returns:
+            NumPy int64 array
+        """
+
+        # pylint: disable = C0415
+        import numpy as np
+
+        if (bits or BITS) == 32:
+            x = (x & np.uint64(0xffffffff)).astype(np.uint32).view(np.int32).astype(np.int64)
+        else:
+            x = x.view(np.int64)
+
+        # -1 is reserved for errors
+        x[x == -1] = -2
+
+        return x
+
+    @staticmethod
+    def thash(value, bits=None):
         """
         Returns a Python 2.7 hash for a tuple.
 
@@ -58,11 +515,16 @@ class Hash(object):
 
         Args:
             value: input tuple
+            bits: C long size in bits
 
         Returns:
             Python 2.7 hash
         """
 
+        # Compiled version hashes built-in element types directly
+        if native and Hash.STANDARD:
+            return native.thash(value, bits or BITS, Hash.hash)
+
         length = len(value)
 
         mult = 1000003
@@ -71,14 +533,14 @@ class Hash(object):
         for y in value:
             length -= 1
 
-            y = Hash.hash(y)
+            y = Hash.hash(y, bits)
             x = (x ^ y) * mult
             mult += 82520 + length + length
 
         x += 97531
 
         # Convert to C type
-        x = ctypes.c_long(x).value
+        x = Hash.clong(x, bits)
 
         if x == -1:
             x = -2
@@ -86,7 +548,7 @@ class Hash(object):
         return x
 
     @staticmethod
-    def fhash(value):
+    def fhash(value, bits=None):
         """
         Returns a Python 2.7 hash for a float.
 
@@ -95,14 +557,24 @@ class Hash(object):
 
         Args:
             value: input float
+            bits: C long size in bits
 
         Returns:
             Python 2.7 hash
         """
 
+        if native:
+            return native.fhash(value, bits or BITS)
+
+        if math.isinf(value):
+            return -271828 if value < 0 else 314159
+        if math.isnan(value):
+            return 0
+
         fpart = math.modf(value)
         if fpart[0] == 0.0:
-            return hash(int(fpart[1]))
+            # Integral values hash the same as an equal int
+            return Hash.lhash(int(fpart[1]), bits)
 
         v, e = math.frexp(value)
 
@@ -118,7 +590,47 @@ class Hash(object):
         x = hipart + int(v) + (e << 15)
 
         # Convert to C long type
-        x = ctypes.c_long(x).value
+        x = Hash.clong(x, bits)
+
+        if x == -1:
+            x = -2
+
+        return x
+
+    @staticmethod
+    def lhash(value, bits=None):
+        """
+        Returns a Python 2.7 hash for an int. Values that fit in a C long were Python 2.7 ints, which hash to
+        themselves. Larger values were longs.
+
+        Logic ported from the 2.7 Python branch: cpython/Objects/longobject.c
+        Method: static long long_hash(PyLongObject *v)
+
+        Args:
+            value: input int
+            bits: C long size in bits
+
+        Returns:
+            Python 2.7 hash
+        """
+
+        # Fast path for word-sized values, Python 3 also hashes these to themselves
+        x = hash(value)
+        if x == value and (not bits or bits >= BITS):
+            return x
+
+        mask, sign = MASKS[bits] if bits else (MASK, SIGN)
+
+        # Remaining word-sized values
+        if -sign <= value < sign:
+            return -2 if value == -1 else int(value)
+
+        # long_hash folds digits with an end-around carry. This leaves the absolute value modulo ULONG_MAX, with
+        # ULONG_MAX in place of 0 for non-zero values.
+        x = abs(value) % mask or mask
+
+        # Convert to C long type
+        x = Hash.clong(-x if value < 0 else x, bits)
 
         if x == -1:
             x = -2
@@ -126,7 +638,7 @@ class Hash(object):
         return x
 
     @staticmethod
-    def shash(value):
+    def shash(value, bits=None):
         """
         Returns a Python 2.7 hash for a string.
 
@@ -135,11 +647,15 @@ class Hash(object):
 
         Args:
             value: input string
+            bits: C long size in bits
 
         Returns:
             Python 2.7 hash
         """
 
+        if native and isinstance(value, (str, bytes)):
+            return native.shash(value, bits or BITS)
+
         length = len(value)
 
         if length == 0:
@@ -153,13 +669,68 @@ class Hash(object):
         x ^= length & mask
 
         # Convert to C long type
-        x = ctypes.c_long(x).value
+        x = Hash.clong(x, bits)
 
         if x == -1:
             x = -2
 
         return x
 
+    @staticmethod
+    def sethash(value, bits=None, hashes=None):
+        """
+        Returns a Python 2.7 hash for a frozenset. Elements are combined with xor, so the result doesn't depend on
+        iteration order.
+
+        Logic ported from the 2.7 Python branch: cpython/Objects/setobject.c
+        Method: static long frozenset_hash(PyObject *self)
+
+        Args:
+            value: input frozenset
+            bits: C long size in bits
+            hashes: optional Python 2.7 hashes of each element, computed if not provided
+
+        Returns:
+            Python 2.7 hash
+        """
+
+        if hashes is None:
+            hashes = [Hash.hash(x, bits) for x in value]
+
+        mask = MASKS[bits][0] if bits else MASK
+
+        x = 1927868237 * (len(hashes) + 1)
+        for h in hashes:
+            # Increases bit dispersion for closely spaced hash values
+            x ^= ((h ^ (h << 16) ^ 89869747) * 3644798167) & mask
+
+        x = x * 69069 + 907133923
+
+        # Convert to C long type
+        x = Hash.clong(x, bits)
+
+        if x == -1:
+            x = 590923713
+
+        return x
+
+    @staticmethod
+    def clong(value, bits=None):
+        """
+        Converts value to a signed C long, wrapping around on overflow. Same result as ctypes.c_long(value).value.
+
+        Args:
+            value: input int
+            bits: C long size in bits
+
+        Returns:
+            C long value
+        """
+
+        mask, sign = MASKS[bits] if bits else (MASK, SIGN)
+
+        return ((value + sign) & mask) - sign
+
     @staticmethod
     def ordinal(value):
         """
@@ -173,3 +744,10 @@ class Hash(object):
         """
 
         return value if isinstance(value, int) else ord(value)
+
+# Built-in types
+Hash.DEFAULTS = {tuple: Hash.thash, float: Hash.fhash, int: Hash.lhash, str: Hash.shash, bytes: Hash.shash}
+for kind, method in Hash.DEFAULTS.items():
+    Hash.register(kind, method)
+
+Hash.register(frozenset, Hash.sethash)
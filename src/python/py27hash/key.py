@@ -4,101 +4,257 @@ Compatibility methods to support Python 2.7 style key iteration in Python 3.X+
 This is designed for compatibility not performance.
 """
 
-import ctypes
+import sys
+
+from array import array
+from collections import deque
+from itertools import compress, repeat
 
 # pylint: disable = E0401
-from .hash import Hash
+from .hash import Hash, MASKS, SIZEBITS
 
 class Keys(object):
     """
     Compatibility class to support Python 2.7 style iteration in Python 3.X+
 
+    Keys are placed in an open addressing slot table that mirrors ma_table in Python 2.7's dict. Inserts are placed
+    in the table as they happen, so iteration is a walk over the occupied slots. Deletes leave a dummy entry in
+    place until the next resize.
+
+    The table is stored compactly. An index array maps each slot to an entry in a dense list of keys. Index values
+    are entry positions + 1, 0 marks an unused slot. The index array uses the smallest unsigned integer type that
+    holds the number of entries and is widened as entries are added. Deleted entries are replaced with a dummy and a
+    key placed in a dummy slot reuses its entry. Hashes aren't stored, keys are compared while probing and hashed
+    again when the table is resized.
+
+    On 64-bit platforms with Python 3.9+, not counting the keys themselves, a Keys instance uses no more than 264
+    bytes with up to 4 keys, 320 bytes with up to 8 keys, 384 bytes with up to 10 keys and 22 bytes per key with
+    100+ keys. The upper bound is reached right after a resize, when the table is up to 8 times the number of keys.
+    Earlier Python versions have larger object headers and list over-allocation that add up to 64 bytes per
+    instance. Instances that have been copied also keep the layout of their copies, see copy.
+
+    Python 2.7 sets grow, resize and merge with the same rules as dicts, so Dict and Set share this table.
+
     Logic ported from the 2.7 Python branch: cpython/Objects/dictobject.c
     Logic ported from the 2.7 Python branch: cpython/Objects/setobject.c
     """
 
+    # pylint: disable = R0904
+    __slots__ = ("bits", "sizebits", "sizemask", "index", "table", "used", "finger", "shared", "template")
+
     # Min dict size
     MINSIZE = 8
 
     # Hash collisions
     PERTURB_SHIFT = 5
 
-    def __init__(self):
+    # Index value for an unused slot
+    EMPTY = 0
+
+    # Marker for a deleted entry
+    DUMMY = object()
+
+    # Pickle format version
+    VERSION = 2
+
+    def __init__(self, bits=None, sizebits=None):
         """
         Initializes a keys object.
+
+        Args:
+            bits: C long size in bits used for hashing, defaults to the current platform
+            sizebits: C size_t size in bits used for probing, defaults to bits if set, otherwise the current platform
         """
 
-        self.keylist = []
-        self.keysort = None
+        # Platform word sizes. Windows 64-bit builds have a 32-bit long and 64-bit size_t.
+        self.bits = bits
+        self.sizebits = sizebits
+
+        # Masks for supported sizes are shared between instances
+        width = sizebits or (bits if bits else SIZEBITS)
+        self.sizemask = MASKS[width][0] if width in MASKS else (1 << width) - 1
+
+        # Slot -> entry index, sized to the Python 2 dict default size, and dense list of entries
+        self.index = Keys.indices(Keys.MINSIZE)
+        self.table = []
+
+        # Number of active keys
+        self.used = 0
+
+        # Search finger used by pop, matches me_hash of slot 0 while slot 0 is unused or a dummy
+        self.finger = 0
+
+        # Copy-on-write state. Index and table are shared with other Keys when shared is True. The template is the
+        # cached layout of a copy of these keys.
+        self.shared, self.template = False, None
+
+    def __getstate__(self):
+        """
+        Pickles keys along with the table layout and hashes they'll have once deserialized.
+
+        Python 2.7 deserializes dicts and sets by re-adding each key in iteration order. That layout is built here,
+        so loading only needs to place keys back into their slots.
+
+        Returns:
+            state
+        """
 
-        # Python 2 dict default size
-        self.mask = Keys.MINSIZE - 1
+        # Re-add keys in iteration order
+        layout = Keys(self.bits, self.sizebits)
+        layout.extend(self.keys())
+
+        keys, hashes = layout.entries()
+
+        return {"version": Keys.VERSION, "keylist": keys, "bits": self.bits, "sizebits": self.sizebits,
+                "mask": layout.mask, "slots": layout.slots().tobytes(), "hashes": hashes.tobytes(),
+                "byteorder": sys.byteorder}
 
     def __setstate__(self, state):
         """
-        Overrides default pickling object to force re-adding all keys and match Python 2.7 deserialization logic.
+        Restores pickled keys. The layout stored with the state is restored directly. States pickled by earlier
+        versions re-add all keys to match Python 2.7 deserialization logic.
 
         Args:
             state: input state
         """
 
-        self.__dict__ = state
-        keys = self.keys()
+        keys = state["keylist"]
+        bits, sizebits = state.get("bits"), state.get("sizebits")
+        version = state.get("version", 1)
+
+        if version > Keys.VERSION:
+            raise ValueError("Unsupported Keys pickle version %d" % version)
+
+        if version == Keys.VERSION:
+            self.__init__(bits, sizebits)
+            self.restore(keys, state)
+            return
+
+        # States pickled by the first version store keys in insertion order along with the mask
+        if "mask" in state:
+            self.__init__()
+            self.setMask(state["mask"])
+
+            for k in keys:
+                self.insert(k)
+
+            keys = self.keys()
 
         # Clear keys and re-add to match deserialization logic
-        self.__init__()
+        self.__init__(bits, sizebits)
 
         for k in keys:
             self.add(k)
 
+    def restore(self, keys, state):
+        """
+        Places keys into the slots stored with a pickled state.
+
+        Args:
+            keys: keys in table order
+            state: pickled state
+        """
+
+        slots = array("q")
+        slots.frombytes(state["slots"])
+
+        # Arrays are stored in the byte order of the platform that pickled them
+        if state["byteorder"] != sys.byteorder:
+            slots.byteswap()
+
+        self.index = Keys.indices(state["mask"] + 1, len(keys))
+        self.table = list(keys)
+
+        # Point each slot at its entry
+        deque(map(self.index.__setitem__, slots, range(1, len(keys) + 1)), maxlen=0)
+
+        self.used = len(keys)
+
+    def __len__(self):
+        """
+        Number of active keys.
+
+        Returns:
+            length
+        """
+
+        return self.used
+
     def __iter__(self):
         """
-        Default iterator.
+        Default iterator. Walks the table without building a list.
 
         Returns:
             iterator
         """
 
-        return iter(self.keys())
+        table = self.table
+        return (table[e - 1] for e in self.index if e and table[e - 1] is not Keys.DUMMY)
+
+    @property
+    def mask(self):
+        """
+        Table size - 1. Matches ma_mask in Python 2.7's dict.
+
+        Returns:
+            mask
+        """
+
+        return len(self.index) - 1
+
+    @property
+    def fill(self):
+        """
+        Number of active + dummy slots. Matches ma_fill in Python 2.7's dict.
+
+        Returns:
+            fill
+        """
+
+        return len(self.table)
 
     def keys(self):
         """
         Returns keys ordered using Python 2.7's iteration algorithm.
 
-        Method: static PyDictEntry *lookdict(PyDictObject *mp, PyObject *key, register long hash)
-
         Returns:
           list of keys
         """
 
-        if not self.keysort:
-            keys = []
-            hids = set()
+        # Walk used slots in table order, then drop deleted entries
+        table = self.table
+        keys = list(map(table.__getitem__, map((-1).__add__, filter(None, self.index))))
 
-            for k in self.keylist:
-                # C API uses unsigned values
-                h = ctypes.c_size_t(Hash.hash(k)).value
-                i = h & self.mask
+        return keys if self.used == len(table) else [k for k in keys if k is not Keys.DUMMY]
 
-                hid = i
-                perturb = h
+    def slots(self):
+        """
+        Returns the active slot indices in table order.
 
-                while hid in hids:
-                    i = (i << 2) + i + perturb + 1
+        Returns:
+            array of slot indices
+        """
 
-                    hid = i & self.mask
+        index, table = self.index, self.table
 
-                    perturb >>= Keys.PERTURB_SHIFT
+        if self.used == len(table):
+            return array("q", compress(range(len(index)), index))
 
-                keys.append((hid, k))
-                hids.add(hid)
+        return array("q", [i for i, e in enumerate(index) if e and table[e - 1] is not Keys.DUMMY])
 
-            # Cache result - performance - clear if more keys added
-            self.keysort = [v for (k, v) in sorted(keys, key=lambda x: x[0])]
+    def entries(self):
+        """
+        Returns keys and their hashes ordered using Python 2.7's iteration algorithm.
 
-        return self.keysort
+        Returns:
+            (list of keys, array of hashes)
+        """
+
+        keys = self.keys()
 
-    def add(self, key):
+        return keys, array("q", map(Hash.hash, keys, repeat(self.bits, len(keys))))
+
+    def add(self, key, h=None):
         """
         Called each time a new item is inserted. Tracks via insertion order and will maintain the same order
         as a dict in Python 2.7.
@@ -108,60 +264,144 @@ class Keys(object):
 
         Args:
           key: key to add
+          h: Python 2.7 hash of key, computed if not provided
+        """
+
+        if h is None:
+            h = Hash.hash(key, self.bits)
+
+        # If this is a replace/update then size won't change.
+        i = self.lookup(key, h)
+        e = self.index[i]
+
+        if not e or self.table[e - 1] is Keys.DUMMY:
+            self.detach()
+            self.place(i, key)
+
+            # Resize dict if active + dummy slots are at 2/3 capacity
+            if len(self.table) * 3 >= len(self.index) * 2:
+                self.resize()
+
+    def extend(self, keys, hashes=None, grow=True):
+        """
+        Adds keys in order in a single pass. Same result as calling add for each key.
+
+        Method: int PyDict_MergeFromSeq2(PyObject *d, PyObject *seq2, int override)
+
+        Args:
+            keys: iterable of keys
+            hashes: optional list of Python 2.7 hashes for keys, computed if not provided
+            grow: if False, keys are inserted without resize checks like dict_fromkeys does after presizing
+        """
+
+        self.detach()
+
+        bits, sizemask = self.bits, self.sizemask
+        index, table, mask = self.index, self.table, len(self.index) - 1
+
+        for x, key in enumerate(keys):
+            h = hashes[x] if hashes is not None else Hash.hash(key, bits)
+
+            # Inlined lookup, probing stops at the key or the first unused slot
+            perturb = h & sizemask
+            i, free = perturb & mask, -1
+
+            e = index[i]
+            while e:
+                k = table[e - 1]
+                if k is Keys.DUMMY:
+                    free = i if free < 0 else free
+                elif k is key or k == key:
+                    break
+
+                i = ((i << 2) + i + perturb + 1) & mask
+                perturb >>= Keys.PERTURB_SHIFT
+                e = index[i]
+            else:
+                # New keys take the first dummy or unused slot, placing can widen the index
+                self.place(free if free >= 0 else i, key)
+                index = self.index
+
+                # Resize dict if active + dummy slots are at 2/3 capacity
+                if grow and len(table) * 3 >= (mask + 1) * 2:
+                    self.resize()
+
+                    index, table, mask = self.index, self.table, len(self.index) - 1
+
+    def prefix(self, keys):
         """
+        Hashes keys in order, stopping at the first key without a Python 2.7 hash. Containers use this to add the
+        same leading keys to both the backing container and this keylist when a bulk update fails partway.
 
-        # Add key to list. If this is a replace/update then size won't change.
-        if key and key not in self.keylist:
-            # Append key to list
-            self.keylist.append(key)
+        Args:
+            keys: list of keys
 
-            # Clear cached keys
-            self.keysort = None
+        Returns:
+            (list of hashes for the leading keys that could be hashed, TypeError for the next key or None)
+        """
 
-            # Resize dict if 2/3 capacity
-            if len(self.keylist) * 3 >= ((self.mask + 1) * 2):
-                # Reset key list to simulate the dict resize + copy operation
-                self.keylist = self.keys()
-                self.keysort = None
+        try:
+            return list(map(Hash.hash, keys, repeat(self.bits, len(keys)))), None
+        except TypeError:
+            pass
 
-                self.setMask()
+        hashes = []
+        try:
+            for key in keys:
+                hashes.append(Hash.hash(key, self.bits))
+        except TypeError as error:
+            return hashes, error
+
+        return hashes, None
 
     def remove(self, key):
         """
-        Remove a key from the backing list.
+        Remove a key from the backing table. The entry is replaced with a dummy entry.
+
+        Method: int PyDict_DelItem(PyObject *op, PyObject *key)
 
         Args:
             key: key to remove
         """
 
-        if key in self.keylist:
-            # Remove key from list
-            self.keylist.remove(key)
+        h = Hash.hash(key, self.bits)
+        i = self.lookup(key, h)
+        e = self.index[i]
+
+        if e and self.table[e - 1] is not Keys.DUMMY:
+            self.detach()
+            self.table[e - 1] = Keys.DUMMY
+            self.used -= 1
 
-            # Clear cached keys
-            self.keysort = None
+            # Dummy slots keep the hash of the deleted key
+            if not i:
+                self.finger = h
 
-    def merge(self, d):
+    def merge(self, d, hashes=None):
         """
         Merges keys from an existing iterable into this key list.
 
         Method: int PyDict_Merge(PyObject *a, PyObject *b, int override)
 
         Args:
-            d: input dict
+            d: input dict, Keys or list of keys in iteration order
+            hashes: optional list of Python 2.7 hashes for a list of keys
         """
 
+        # Merging keys with themselves or with an empty input doesn't change anything
+        if d is self or not len(d):
+            return
+
         # PyDict_Merge initial merge size is double the size of the current + incoming dict
-        if (len(self.keylist) + len(d)) * 3 >= (self.mask + 1) * 2:
-            self.setMask((len(self.keylist) + len(d)) * 2)
+        if (len(self.table) + len(d)) * 3 >= len(self.index) * 2:
+            self.resize((self.used + len(d)) * 2)
 
-        # Copy actual keys
-        for k in d:
-            self.add(k)
+        self.extend(d, hashes)
 
     def copy(self):
         """
-        Makes a copy of self.
+        Makes a copy of self. The copy layout is built once and cached as a template until these keys change.
+        Copies share the template's index and table until they are changed.
 
         Method: PyObject *PyDict_Copy(PyObject *o)
 
@@ -169,15 +409,48 @@ class Keys(object):
             copy of self
         """
 
-        # Copy creates a new object and merges keys in
-        new = Keys()
-        new.merge(self.keys())
+        if self.template is None:
+            # Copy creates a new object and merges keys in
+            template = Keys(self.bits, self.sizebits)
+            template.merge(self)
+
+            self.template = template
+
+        return self.template.share()
+
+    def share(self):
+        """
+        Creates a new Keys that shares this instance's index and table. Both instances clone the shared storage
+        before they are changed.
+
+        Returns:
+            Keys
+        """
+
+        new = Keys.__new__(Keys)
+
+        new.bits, new.sizebits, new.sizemask = self.bits, self.sizebits, self.sizemask
+        new.index, new.table, new.used, new.finger = self.index, self.table, self.used, self.finger
+        new.template = None
+
+        self.shared = new.shared = True
 
         return new
 
+    def detach(self):
+        """
+        Called before these keys change. Clones storage shared with other Keys and drops the cached copy layout.
+        """
+
+        if self.shared:
+            self.index, self.table = self.index[:], self.table[:]
+            self.shared = False
+
+        self.template = None
+
     def pop(self):
         """
-        Pops the top element from the sorted keys if it exists. Returns None otherwise.
+        Pops the first element found from the search finger if it exists. Returns None otherwise.
 
         Method: static PyObject *dict_popitem(PyDictObject *mp)
 
@@ -185,23 +458,156 @@ class Keys(object):
             top element or None if Keys is empty
         """
 
-        if self.keylist:
-            # Pop the top element
-            value = self.keys()[0]
-            self.remove(value)
+        if self.used:
+            self.detach()
+            index, table, mask = self.index, self.table, len(self.index) - 1
+
+            # Slot 0 is checked first, otherwise search starts at the finger
+            i, e = 0, index[0]
+            if not e or table[e - 1] is Keys.DUMMY:
+                i = self.finger
+                if i > mask or i < 1:
+                    i = 1
+
+                e = index[i]
+                while not e or table[e - 1] is Keys.DUMMY:
+                    i += 1
+                    if i > mask:
+                        i = 1
+
+                    e = index[i]
+
+            value = table[e - 1]
+            table[e - 1] = Keys.DUMMY
+            self.used -= 1
+
+            # Next place to start
+            self.finger = i + 1
+
             return value
 
         return None
 
+    def lookup(self, key, h):
+        """
+        Finds the slot for a key. Returns the slot holding key if it's in the table, otherwise the first dummy or
+        unused slot in its probe sequence.
+
+        Method: static PyDictEntry *lookdict(PyDictObject *mp, PyObject *key, register long hash)
+
+        Args:
+            key: key
+            h: Python 2.7 hash of key
+
+        Returns:
+            slot index
+        """
+
+        index, table, mask = self.index, self.table, len(self.index) - 1
+
+        # C API uses unsigned values
+        perturb = h & self.sizemask
+        i, free = perturb & mask, -1
+
+        e = index[i]
+        while e:
+            k = table[e - 1]
+            if k is Keys.DUMMY:
+                free = i if free < 0 else free
+            elif k is key or k == key:
+                return i
+
+            # Only the masked bits of i are ever used, keep it bounded
+            i = ((i << 2) + i + perturb + 1) & mask
+            perturb >>= Keys.PERTURB_SHIFT
+            e = index[i]
+
+        return free if free >= 0 else i
+
+    def place(self, i, key):
+        """
+        Stores a new key at slot i. Unused slots get a new entry, dummy slots reuse their entry.
+
+        Args:
+            i: slot index from lookup
+            key: key to store
+        """
+
+        e = self.index[i]
+        if e:
+            self.table[e - 1] = key
+        else:
+            self.table.append(key)
+            e = len(self.table)
+
+            # Widen the index once entry positions no longer fit, see indices
+            if e in (0x100, 0x10000, 0x100000000):
+                self.index = Keys.indices(len(self.index), e, self.index)
+
+            self.index[i] = e
+
+        self.used += 1
+
+    def insert(self, key, h=None):
+        """
+        Places a new key in the table.
+
+        Method: static int insertdict_by_entry(register PyDictObject *mp, PyObject *key, long hash, PyDictEntry *ep,
+                                               PyObject *value)
+
+        Args:
+            key: key to insert
+            h: Python 2.7 hash of key, computed if not provided
+        """
+
+        if h is None:
+            h = Hash.hash(key, self.bits)
+
+        self.detach()
+        self.place(self.lookup(key, h), key)
+
+    def resize(self, request=None):
+        """
+        Resizes the table and re-inserts all active keys in slot order. Dummy entries are dropped and keys are
+        hashed again.
+
+        Method: static int dictresize(PyDictObject *mp, Py_ssize_t minused)
+
+        Args:
+            request: minimum size requested, defaults to the Python 2.7 growth policy
+        """
+
+        keys, hashes = self.entries()
+
+        self.used = len(keys)
+        self.setMask(request)
+
+        index, mask, sizemask = self.index, len(self.index) - 1, self.sizemask
+
+        # The new table has no dummy entries or duplicates, each key takes the first unused slot in its probe sequence
+        for e, h in enumerate(hashes, 1):
+            perturb = h & sizemask
+            i = perturb & mask
+
+            while index[i]:
+                i = ((i << 2) + i + perturb + 1) & mask
+                perturb >>= Keys.PERTURB_SHIFT
+
+            index[i] = e
+
+        self.table = keys
+        self.finger, self.shared, self.template = 0, False, None
+
     def setMask(self, request=None):
         """
-        Key based on the total size of this dict. Matches ma_mask in Python 2.7's dict.
+        Sizes the table based on the total size of this dict. Matches ma_mask in Python 2.7's dict. All slots are
+        cleared.
 
         Method: static int dictresize(PyDictObject *mp, Py_ssize_t minused)
         """
 
         if not request:
-            length = len(self.keylist)
+            length = self.used
 
             # Python 2 dict increases by a factor of 4 for small dicts, 2 for larger ones
             request = length * (2 if length > 50000 else 4)
@@ -210,4 +616,25 @@ class Keys(object):
         while newsize <= request:
             newsize <<= 1
 
-        self.mask = newsize - 1
+        self.index = Keys.indices(newsize, self.used)
+
+    @staticmethod
+    def indices(size, entries=0, index=None):
+        """
+        Creates an index array for a table with size slots. The smallest unsigned integer type that holds entries is
+        used. A bytearray is used for up to 255 entries, it has less overhead than an array.
+
+        Args:
+            size: table size
+            entries: number of entries the index needs to hold
+            index: optional index to copy, a zero filled index is created if not provided
+
+        Returns:
+            bytearray or array
+        """
+
+        if entries <= 0xFF:
+            return bytearray(size) if index is None else bytearray(index)
+
+        code = "H" if entries <= 0xFFFF else "I" if entries <= 0xFFFFFFFF else "Q"
+        return array(code, [Keys.EMPTY]) * size if index is None else array(code, iter(index))
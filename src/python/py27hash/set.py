@@ -4,14 +4,32 @@ Compatibility methods to support Python 2.7 style sets in Python 3.X+
 This is designed for compatibility not performance.
 """
 
+import io
+
 # pylint: disable = E0401
+from .hash import Hash
 from .key import Keys
+from .text import Text
 
 class Set(set):
     """
     Compatibility class to support Python 2.7 style iteration in Python 3.X+
+
+    The bits and sizebits attributes set the C long and size_t sizes used for hashing and probing. Subclasses can
+    set these to reproduce iteration order from 32-bit or Windows Python 2.7 builds. Defaults to the current platform.
+
+    Elements must have a Python 2.7 hash. Elements that don't, such as None which Python 2.7 hashes by memory
+    address, raise a TypeError before the Set is changed.
+
+    Set algebra methods and operators return Sets built the same way Python 2.7 builds them.
+
+    Logic ported from the 2.7 Python branch: cpython/Objects/setobject.c
     """
 
+    # C long and size_t sizes in bits
+    bits = None
+    sizebits = None
+
     def __init__(self, *args, **kwargs):
         """
         Overrides set logic to always call set item. This allows Python 2.7 iteration.
@@ -23,11 +41,35 @@ class Set(set):
 
         super(Set, self).__init__()
 
-        self.keylist = Keys()
+        self.keylist = Keys(self.bits, self.sizebits)
 
         # Initialize base arguments
         self.update(*args, **kwargs)
 
+    def __reduce__(self):
+        """
+        Pickles the Set as its keylist. The backing set is rebuilt from the keylist when loaded, so keys are not
+        re-added one by one.
+
+        Returns:
+            reduce tuple
+        """
+
+        return (self.__class__, (), self.__dict__)
+
+    def __setstate__(self, state):
+        """
+        Restores a pickled Set.
+
+        Args:
+            state: input state
+        """
+
+        self.__dict__.update(state)
+
+        # Rebuild backing set
+        super(Set, self).update(self.keylist)
+
     def add(self, value):
         """
         Adds value to the set.
@@ -36,10 +78,14 @@ class Set(set):
             value: value to add
         """
 
+        # Hash new elements first, so elements without a Python 2.7 hash are rejected before anything changes
+        h = None if value in self else Hash.hash(value, self.keylist.bits)
+
         super(Set, self).add(value)
 
         # Store key for Python 2.7 iteration
-        self.keylist.add(value)
+        if h is not None:
+            self.keylist.add(value, h)
 
     def remove(self, value):
         """
@@ -56,42 +102,79 @@ class Set(set):
 
     def discard(self, value):
         """
-        Discards a value from the set.
+        Discards a value from the set if it's present.
 
         Args:
             value: value to remove
         """
 
-        self.remove(value)
+        if value in self:
+            self.remove(value)
 
     def update(self, *args, **kwargs):
         """
         Overrides set logic to always call add item. This allows Python 2.7 style iteration.
 
+        Sets and dicts are merged in after a single presize, other iterables are added one element at a time.
+
+        Method: static int set_update_internal(PySetObject *so, PyObject *iterable)
+
         Args:
             *args: args
             *kwargs: keyword args
         """
 
         for arg in args:
-            # Cast to set if applicable. Otherwise, assume it's an iterable of (key, value) pairs.
-            if isinstance(arg, set):
-                # Merge incoming keys into keylist
-                self.keylist.merge(arg)
+            keys = getattr(arg, "keylist", None)
+
+            if isinstance(arg, (set, frozenset)) or Set.mapping(arg):
+                if isinstance(keys, Keys):
+                    # Merge incoming keys into keylist, reusing cached hashes from a Set, FrozenSet or Dict
+                    self.keylist.merge(keys)
 
-            for k in arg:
-                self.add(k)
+                    super(Set, self).update(arg)
+                else:
+                    self.insert(list(arg), True)
+            else:
+                # Iterators can only be consumed once
+                self.insert(list(arg))
 
         for k in list(**kwargs):
             self.add(k)
 
+    def insert(self, keys, merge=False):
+        """
+        Adds a batch of elements. Elements are hashed before anything changes. If an element can't be hashed, the
+        elements before it are still added to both the backing set and keylist, the same as Python 2.7, and the
+        error is raised.
+
+        Args:
+            keys: list of elements
+            merge: presizes once like set_merge if True, otherwise elements are added one at a time
+        """
+
+        hashes, error = self.keylist.prefix(keys)
+
+        if error:
+            keys = keys[:len(hashes)]
+
+        super(Set, self).update(keys)
+
+        if merge:
+            self.keylist.merge(keys, hashes)
+        else:
+            self.keylist.extend(keys, hashes)
+
+        if error:
+            raise error
+
     def clear(self):
         """
         Clears the set along with it's backing Python 2.7 keylist.
         """
 
         super(Set, self).clear()
-        self.keylist = Keys()
+        self.keylist = Keys(self.bits, self.sizebits)
 
     def copy(self):
         """
@@ -101,14 +184,13 @@ class Set(set):
             copy of self
         """
 
-        new = Set()
+        new = self.__class__()
 
-        # First copy the keylist to the new object
+        # First copy the keylist to the new object, the table is shared until either side changes
         new.keylist = self.keylist.copy()
 
         # Copy keys into backing set
-        for v in self:
-            new.add(v)
+        super(Set, new).update(self)
 
         return new
 
@@ -128,6 +210,440 @@ class Set(set):
 
         return None
 
+    def union(self, *others):
+        """
+        Elements in this set or any of the others.
+
+        Method: static PyObject *set_union(PySetObject *so, PyObject *args)
+
+        Args:
+            others: iterables
+
+        Returns:
+            Set
+        """
+
+        # Merging a set with itself is skipped
+        result = self.copy()
+        result.update(*[other for other in others if other is not self])
+
+        return result
+
+    def intersection(self, *others):
+        """
+        Elements in this set and all of the others.
+
+        Method: static PyObject *set_intersection_multi(PySetObject *so, PyObject *args)
+
+        Args:
+            others: iterables
+
+        Returns:
+            Set
+        """
+
+        if not others:
+            return self.copy()
+
+        result = self
+        for other in others:
+            result = Set.intersect(result, other)
+
+        return result
+
+    def difference(self, *others):
+        """
+        Elements in this set that aren't in any of the others.
+
+        Method: static PyObject *set_difference_multi(PySetObject *so, PyObject *args)
+
+        Args:
+            others: iterables
+
+        Returns:
+            Set
+        """
+
+        if not others:
+            return self.copy()
+
+        result = Set.subtract(self, others[0])
+        result.difference_update(*others[1:])
+
+        return result
+
+    def symmetric_difference(self, other):
+        """
+        Elements in either this set or other but not both. The result starts as a copy of other.
+
+        Method: static PyObject *set_symmetric_difference(PySetObject *so, PyObject *other)
+
+        Args:
+            other: iterable
+
+        Returns:
+            Set
+        """
+
+        result = self.__class__(other)
+        result.symmetric_difference_update(self)
+
+        return result
+
+    def intersection_update(self, *others):
+        """
+        Keeps elements found in all of the others. This set takes the layout of the intersection.
+
+        Method: static PyObject *set_intersection_update_multi(PySetObject *so, PyObject *args)
+
+        Args:
+            others: iterables
+        """
+
+        result = self.intersection(*others)
+
+        super(Set, self).clear()
+        super(Set, self).update(result)
+
+        self.keylist = result.keylist
+
+    def difference_update(self, *others):
+        """
+        Removes elements found in any of the others. Deleted slots are cleared with a resize once they pass 1/5 of
+        the table.
+
+        Method: static int set_difference_update_internal(PySetObject *so, PyObject *other)
+
+        Args:
+            others: iterables
+        """
+
+        for other in others:
+            if other is self:
+                self.clear()
+                continue
+
+            keys = Set.elements(other, self.bits)[0] if isinstance(other, (set, frozenset)) else other
+            for k in keys:
+                self.discard(k)
+
+            # If more than 1/5 are dummies, then resize them away
+            keylist = self.keylist
+            if (keylist.fill - len(keylist)) * 5 >= keylist.mask:
+                keylist.resize()
+
+    def symmetric_difference_update(self, other):
+        """
+        Removes elements found in both this set and other and adds elements only found in other.
+
+        Method: static PyObject *set_symmetric_difference_update(PySetObject *so, PyObject *other)
+
+        Args:
+            other: iterable
+        """
+
+        if other is self:
+            self.clear()
+            return
+
+        # Anything other than a dict or set is first collected into a new set
+        if not isinstance(other, (set, frozenset)) and not Set.mapping(other):
+            other = self.__class__(other)
+
+        keys, hashes = Set.elements(other, self.bits)
+        for x, k in enumerate(keys):
+            if k in self:
+                self.remove(k)
+            else:
+                # Hash first, so elements without a Python 2.7 hash are rejected before anything changes
+                h = hashes[x] if hashes is not None else Hash.hash(k, self.keylist.bits)
+
+                super(Set, self).add(k)
+                self.keylist.add(k, h)
+
+    @staticmethod
+    def intersect(left, right):
+        """
+        Elements in both left and right. When right is a set, the smaller operand is iterated and the larger one is
+        checked for membership.
+
+        Method: static PyObject *set_intersection(PySetObject *so, PyObject *other)
+
+        Args:
+            left: Set
+            right: iterable
+
+        Returns:
+            Set
+        """
+
+        if left is right:
+            return left.copy()
+
+        if isinstance(right, (set, frozenset)):
+            this, other = (right, left) if len(right) > len(left) else (left, right)
+            keys, hashes = Set.elements(other, left.bits)
+        else:
+            this, keys, hashes = left, list(right), None
+
+        # Elements are added in iteration order with their cached hashes
+        found = [x for x, k in enumerate(keys) if k in this]
+
+        return left.build([keys[x] for x in found], [hashes[x] for x in found] if hashes is not None else None)
+
+    @staticmethod
+    def subtract(left, right):
+        """
+        Elements in left that aren't in right.
+
+        Method: static PyObject *set_difference(PySetObject *so, PyObject *other)
+
+        Args:
+            left: Set
+            right: iterable
+
+        Returns:
+            Set
+        """
+
+        # Other iterables are removed from a copy
+        if not isinstance(right, (set, frozenset)) and not Set.mapping(right):
+            result = left.copy()
+            result.difference_update(right)
+
+            return result
+
+        keys, hashes = Set.elements(left, left.bits)
+        found = [x for x, k in enumerate(keys) if k not in right]
+
+        return left.build([keys[x] for x in found], [hashes[x] for x in found])
+
+    @staticmethod
+    def mapping(value):
+        """
+        Checks if value is a dict or a dict that tracks Python 2.7 order, such as a Dict. Other dict subclasses can
+        override membership and iteration, so they're handled like any other iterable, the same as PyDict_CheckExact.
+
+        Args:
+            value: input value
+
+        Returns:
+            True if value is a dict or tracks Python 2.7 order, False otherwise
+        """
+
+        return type(value) is dict or (isinstance(value, dict) and isinstance(getattr(value, "keylist", None), Keys))
+
+    @staticmethod
+    def elements(value, bits):
+        """
+        Gets the elements of a set or dict in Python 2.7 iteration order along with their cached hashes, if available.
+
+        Args:
+            value: set or dict
+            bits: C long size in bits the hashes will be used with
+
+        Returns:
+            (list of elements, list of Python 2.7 hashes or None)
+        """
+
+        keylist = getattr(value, "keylist", None)
+        if isinstance(keylist, Keys) and keylist.bits == bits:
+            # Thread-safe containers provide a consistent snapshot
+            return value.ordered()[:2] if hasattr(value, "ordered") else keylist.entries()
+
+        return list(value), None
+
+    def build(self, keys, hashes=None):
+        """
+        Creates a new Set of the same type with keys added in order.
+
+        Args:
+            keys: list of keys
+            hashes: optional list of Python 2.7 hashes for keys
+
+        Returns:
+            Set
+        """
+
+        result = self.__class__()
+        result.keylist.extend(keys, hashes)
+
+        super(Set, result).update(keys)
+
+        return result
+
+    def __or__(self, other):
+        """
+        Elements in this set or other.
+
+        Args:
+            other: set
+
+        Returns:
+            Set
+        """
+
+        return self.union(other) if isinstance(other, (set, frozenset)) else NotImplemented
+
+    def __ror__(self, other):
+        """
+        Elements in other or this set.
+
+        Args:
+            other: set
+
+        Returns:
+            Set
+        """
+
+        return self.__class__(other).union(self) if isinstance(other, (set, frozenset)) else NotImplemented
+
+    def __and__(self, other):
+        """
+        Elements in both this set and other.
+
+        Args:
+            other: set
+
+        Returns:
+            Set
+        """
+
+        return Set.intersect(self, other) if isinstance(other, (set, frozenset)) else NotImplemented
+
+    def __rand__(self, other):
+        """
+        Elements in both other and this set.
+
+        Args:
+            other: set
+
+        Returns:
+            Set
+        """
+
+        return Set.intersect(self.__class__(other), self) if isinstance(other, (set, frozenset)) else NotImplemented
+
+    def __sub__(self, other):
+        """
+        Elements in this set that aren't in other.
+
+        Args:
+            other: set
+
+        Returns:
+            Set
+        """
+
+        return Set.subtract(self, other) if isinstance(other, (set, frozenset)) else NotImplemented
+
+    def __rsub__(self, other):
+        """
+        Elements in other that aren't in this set.
+
+        Args:
+            other: set
+
+        Returns:
+            Set
+        """
+
+        return Set.subtract(self.__class__(other), self) if isinstance(other, (set, frozenset)) else NotImplemented
+
+    def __xor__(self, other):
+        """
+        Elements in either this set or other but not both.
+
+        Args:
+            other: set
+
+        Returns:
+            Set
+        """
+
+        return self.symmetric_difference(other) if isinstance(other, (set, frozenset)) else NotImplemented
+
+    def __rxor__(self, other):
+        """
+        Elements in either other or this set but not both.
+
+        Args:
+            other: set
+
+        Returns:
+            Set
+        """
+
+        return self.__class__(other).symmetric_difference(self) if isinstance(other, (set, frozenset)) else NotImplemented
+
+    def __ior__(self, other):
+        """
+        Adds elements from other.
+
+        Args:
+            other: set
+
+        Returns:
+            self
+        """
+
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+
+        self.update(other)
+        return self
+
+    def __iand__(self, other):
+        """
+        Keeps elements found in other.
+
+        Args:
+            other: set
+
+        Returns:
+            self
+        """
+
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+
+        self.intersection_update(other)
+        return self
+
+    def __isub__(self, other):
+        """
+        Removes elements found in other.
+
+        Args:
+            other: set
+
+        Returns:
+            self
+        """
+
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+
+        self.difference_update(other)
+        return self
+
+    def __ixor__(self, other):
+        """
+        Removes elements found in both this set and other and adds elements only found in other.
+
+        Args:
+            other: set
+
+        Returns:
+            self
+        """
+
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+
+        self.symmetric_difference_update(other)
+        return self
+
     def __iter__(self):
         """
         Default iterator.
@@ -140,21 +656,16 @@ class Set(set):
 
     def __str__(self):
         """
-        Creates a string version of this Set.
+        Creates a string version of this Set. Matches repr strings from Python 2.7.
 
         Returns:
             string
         """
 
-        string = "set(["
+        fp = io.StringIO()
+        self.write_repr(fp)
 
-        for x, k in enumerate(self):
-            string += ", " if x > 0 else ""
-            string += "'%s'" % (k)
-
-        string += "])"
-
-        return string
+        return fp.getvalue()
 
     def __repr__(self):
         """
@@ -165,3 +676,14 @@ class Set(set):
         """
 
         return self.__str__()
+
+    def write_repr(self, fp):
+        """
+        Writes the Python 2.7 repr string of this Set to a text stream. Output is written in chunks as it's
+        generated.
+
+        Args:
+            fp: text stream, any object with a write method
+        """
+
+        Text(fp, self.bits).write(self)
@@ -0,0 +1,472 @@
+"""
+Compatibility methods to support read-only Python 2.7 style dict snapshots in Python 3.X+
+
+This is designed for compatibility not performance.
+"""
+
+import mmap
+import pickle
+import struct
+import sys
+
+from array import array
+
+# pylint: disable = E0401
+from .hash import Hash, SIZEBITS
+from .key import Keys
+
+class Snapshot(object):
+    """
+    Read-only Dict stored in a flat binary file. Snapshots are written once and opened with mmap, so multiple
+    processes share the same pages. Lookups and iteration run directly off the mapped buffer and iterate in the
+    same order as the Dict the snapshot was written from.
+
+    File layout, sections are aligned to 8 bytes:
+      - header: magic, version, bits, sizebits, byte order, mask, count and section offsets
+      - hashes: int64 per slot, the cached Python 2.7 hash of each key
+      - table: int64 per slot, the entry index of the key in the slot, -1 for an unused slot and -2 for a deleted slot
+      - data: encoded keys and values
+      - entries: (key offset, key length, value offset, value length) uint64 per entry in iteration order
+
+    Keys and values are encoded with a one byte type tag. str values are stored as UTF-8, bytes as is and everything
+    else is pickled.
+
+    Logic ported from the 2.7 Python branch: cpython/Objects/dictobject.c
+    """
+
+    # File identifier and format version
+    MAGIC = b"PY27SNAP"
+    VERSION = 1
+
+    # magic, version, bits, sizebits, big endian flag, mask, count, hashes, table, data, entries
+    HEADER = struct.Struct("<8sIIII6Q")
+
+    # Table markers
+    EMPTY = -1
+    DUMMY = -2
+
+    # Encoding type tags
+    STR, BYTES, PICKLE = b"s", b"b", b"p"
+
+    def __init__(self, path):
+        """
+        Opens a snapshot file.
+
+        Args:
+            path: snapshot file path
+        """
+
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.buffer = memoryview(self.mmap)
+
+        magic, version, self.bits, self.sizebits, big, self.mask, self.count, hashes, table, _, entries = \
+            Snapshot.HEADER.unpack_from(self.mmap, 0)
+
+        if magic != Snapshot.MAGIC:
+            self.close()
+            raise ValueError("%s is not a Python 2.7 dict snapshot" % path)
+
+        if version > Snapshot.VERSION:
+            self.close()
+            raise ValueError("Unsupported snapshot version %d" % version)
+
+        # 0 is stored when the platform default was used
+        self.bits = self.bits if self.bits else None
+        self.sizebits = self.sizebits if self.sizebits else None
+        self.sizemask = (1 << (self.sizebits or (self.bits if self.bits else SIZEBITS))) - 1
+
+        size = self.mask + 1
+        self.hashes = self.section(hashes, size, "q", big)
+        self.table = self.section(table, size, "q", big)
+        self.entries = self.section(entries, self.count * 4, "Q", big)
+
+    def __enter__(self):
+        """
+        Context manager entry.
+
+        Returns:
+            self
+        """
+
+        return self
+
+    def __exit__(self, *args):
+        """
+        Closes this snapshot on context manager exit.
+
+        Args:
+            *args: exception details
+        """
+
+        self.close()
+
+    def __len__(self):
+        """
+        Number of entries.
+
+        Returns:
+            length
+        """
+
+        return self.count
+
+    def __iter__(self):
+        """
+        Iterates over keys in Python 2.7 order.
+
+        Returns:
+            iterator
+        """
+
+        return (self.key(x) for x in range(self.count))
+
+    def __contains__(self, key):
+        """
+        Checks if key is in this snapshot.
+
+        Args:
+            key: key to check
+
+        Returns:
+            True if found, False otherwise
+        """
+
+        return self.find(key) >= 0
+
+    def __getitem__(self, key):
+        """
+        Gets the value for key.
+
+        Args:
+            key: key to lookup
+
+        Returns:
+            value
+        """
+
+        x = self.find(key)
+        if x < 0:
+            raise KeyError(key)
+
+        return self.value(x)
+
+    def get(self, key, default=None):
+        """
+        Gets the value for key if it exists, returns default otherwise.
+
+        Args:
+            key: key to lookup
+            default: value to return if key is not found
+
+        Returns:
+            value of key if found or default
+        """
+
+        x = self.find(key)
+        return self.value(x) if x >= 0 else default
+
+    def keys(self):
+        """
+        Returns keys ordered using Python 2.7's iteration algorithm.
+
+        Returns:
+            list of keys
+        """
+
+        return list(self)
+
+    def values(self):
+        """
+        Returns values ordered using Python 2.7's iteration algorithm.
+
+        Returns:
+            list of values
+        """
+
+        return list(self.itervalues())
+
+    def items(self):
+        """
+        Returns items ordered using Python 2.7's iteration algorithm.
+
+        Returns:
+            list of items
+        """
+
+        return list(self.iteritems())
+
+    def iterkeys(self):
+        """
+        Backwards compat method for Python 2 dict
+
+        Returns:
+            iterator over keys
+        """
+
+        return iter(self)
+
+    def itervalues(self):
+        """
+        Backwards compat method for Python 2 dict
+
+        Returns:
+            iterator over values
+        """
+
+        return (self.value(x) for x in range(self.count))
+
+    def iteritems(self):
+        """
+        Backwards compat method for Python 2 dict
+
+        Returns:
+            iterator over items
+        """
+
+        return ((self.key(x), self.value(x)) for x in range(self.count))
+
+    def close(self):
+        """
+        Releases the mapped buffer.
+        """
+
+        # Views must be released before the mmap can be closed
+        for name in ["hashes", "table", "entries", "buffer"]:
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+
+            setattr(self, name, None)
+
+        if self.mmap:
+            self.mmap.close()
+            self.mmap = None
+
+    def find(self, key):
+        """
+        Finds the entry index for key by probing the mapped slot table.
+
+        Method: static PyDictEntry *lookdict(PyDictObject *mp, PyObject *key, register long hash)
+
+        Args:
+            key: key to lookup
+
+        Returns:
+            entry index or -1 if not found
+        """
+
+        h = Hash.hash(key, self.bits)
+        table, hashes, mask = self.table, self.hashes, self.mask
+
+        # str and bytes keys are encoded once and compared against stored bytes
+        # pylint: disable = C0123
+        tag, data = Snapshot.encode(key) if type(key) in (str, bytes) else (Snapshot.PICKLE, None)
+
+        # C API uses unsigned values
+        perturb = h & self.sizemask
+        i = perturb & mask
+
+        while True:
+            x = table[i]
+            if x == Snapshot.EMPTY:
+                return -1
+
+            if x >= 0 and hashes[i] == h and self.equals(x, key, tag, data):
+                return x
+
+            i = ((i << 2) + i + perturb + 1) & mask
+            perturb >>= Keys.PERTURB_SHIFT
+
+    def equals(self, x, key, tag, data):
+        """
+        Checks if the key at entry x equals key.
+
+        Args:
+            x: entry index
+            key: key
+            tag: encoded key type tag
+            data: encoded key
+
+        Returns:
+            True if equal, False otherwise
+        """
+
+        offset, length = self.entries[x * 4], self.entries[x * 4 + 1]
+        stored = self.mmap[offset:offset + 1]
+
+        # str and bytes keys are compared without decoding
+        if Snapshot.PICKLE not in (tag, stored):
+            return tag == stored and self.buffer[offset + 1:offset + length] == data
+
+        return self.decode(offset, length) == key
+
+    def key(self, x):
+        """
+        Decodes the key at entry x.
+
+        Args:
+            x: entry index
+
+        Returns:
+            key
+        """
+
+        return self.decode(self.entries[x * 4], self.entries[x * 4 + 1])
+
+    def value(self, x):
+        """
+        Decodes the value at entry x.
+
+        Args:
+            x: entry index
+
+        Returns:
+            value
+        """
+
+        return self.decode(self.entries[x * 4 + 2], self.entries[x * 4 + 3])
+
+    def decode(self, offset, length):
+        """
+        Decodes a key or value from the mapped buffer.
+
+        Args:
+            offset: start offset
+            length: encoded length including the type tag
+
+        Returns:
+            decoded object
+        """
+
+        return Snapshot.unpack(self.mmap[offset:offset + 1], self.buffer[offset + 1:offset + length])
+
+    def section(self, offset, size, typecode, big):
+        """
+        Maps an array section of the file.
+
+        Args:
+            offset: start offset
+            size: number of elements
+            typecode: array type code
+            big: True if the file was written on a big endian platform
+
+        Returns:
+            zero copy view if the file byte order matches the current platform, otherwise a byte swapped copy
+        """
+
+        view = self.buffer[offset:offset + size * 8]
+
+        if big == (sys.byteorder == "big"):
+            return view.cast(typecode)
+
+        values = array(typecode)
+        values.frombytes(view.tobytes())
+        values.byteswap()
+
+        view.release()
+
+        return values
+
+    @staticmethod
+    def write(path, mapping, bits=None, sizebits=None):
+        """
+        Writes a snapshot file. Dicts are written with their existing layout, so the snapshot iterates in the same
+        order. Other mappings are ordered as if their keys had been added to a Python 2.7 dict in iteration order.
+
+        Args:
+            path: output file path
+            mapping: Dict or mapping
+            bits: C long size in bits (32 or 64) for other mappings, defaults to the current platform
+            sizebits: C size_t size in bits for other mappings, defaults to bits if set, otherwise the current platform
+        """
+
+        keylist = getattr(mapping, "keylist", None)
+        if not isinstance(keylist, Keys):
+            keylist = Keys(bits, sizebits)
+            keylist.extend(list(mapping))
+
+        (keys, hashes), slots = keylist.entries(), keylist.slots()
+
+        # Slot table, key slots hold the entry index
+        table = array("q", [Snapshot.EMPTY]) * (keylist.mask + 1)
+        for i, e in enumerate(keylist.index):
+            if e and keylist.table[e - 1] is Keys.DUMMY:
+                table[i] = Snapshot.DUMMY
+
+        # Hashes are stored per slot
+        cache = array("q", [0]) * (keylist.mask + 1)
+        for x, i in enumerate(slots):
+            table[i], cache[i] = x, hashes[x]
+
+        with open(path, "wb") as f:
+            # Header is written last, once offsets are known
+            f.write(b"\0" * Snapshot.HEADER.size)
+
+            hashes = f.tell()
+            f.write(cache.tobytes())
+
+            start = f.tell()
+            f.write(table.tobytes())
+
+            # Stream encoded keys and values, keeping offsets for the entries section
+            data, entries = f.tell(), array("Q")
+            for k in keys:
+                for value in (k, mapping[k]):
+                    tag, encoded = Snapshot.encode(value)
+
+                    entries.append(f.tell())
+                    entries.append(len(encoded) + 1)
+
+                    f.write(tag)
+                    f.write(encoded)
+
+            f.write(b"\0" * (-f.tell() % 8))
+
+            offset = f.tell()
+            f.write(entries.tobytes())
+
+            f.seek(0)
+            f.write(Snapshot.HEADER.pack(Snapshot.MAGIC, Snapshot.VERSION, keylist.bits or 0, keylist.sizebits or 0,
+                                         sys.byteorder == "big", keylist.mask, len(keys), hashes, start, data,
+                                         offset))
+
+    @staticmethod
+    def encode(value):
+        """
+        Encodes a key or value.
+
+        Args:
+            value: input value
+
+        Returns:
+            (type tag, encoded bytes)
+        """
+
+        # pylint: disable = C0123
+        if type(value) is str:
+            return Snapshot.STR, value.encode("utf-8", "surrogatepass")
+
+        if type(value) is bytes:
+            return Snapshot.BYTES, value
+
+        return Snapshot.PICKLE, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def unpack(tag, data):
+        """
+        Decodes an encoded key or value.
+
+        Args:
+            tag: type tag
+            data: encoded bytes or buffer
+
+        Returns:
+            decoded object
+        """
+
+        if tag == Snapshot.STR:
+            return str(data, "utf-8", "surrogatepass")
+
+        return bytes(data) if tag == Snapshot.BYTES else pickle.loads(data)
@@ -0,0 +1,338 @@
+"""
+Compatibility methods to compute Python 2.7 style iteration order for large key streams in Python 3.X+
+
+This is designed for compatibility not performance.
+"""
+
+import mmap
+import tempfile
+
+# pylint: disable = E0401
+from .hash import Hash, SIZEBITS
+from .key import Keys
+from .snapshot import Snapshot
+
+class Stream(object):
+    """
+    Computes the order Python 2.7 would iterate a stream of keys in, without building a Dict. Keys are added as
+    they arrive and the dict resize and probe logic is simulated over a compact slot table.
+
+    Storage is made up of int64 columns and an encoded key file:
+      - table: entry number + 1 per slot, 0 for an unused slot
+      - hashes: cached Python 2.7 hash per slot
+      - offsets: data file offset per entry, entries are distinct keys in arrival order
+      - positions: input position of the first occurrence of each entry
+
+    Keys are only read back from the data file to check equality when hashes match and for iteration. Columns
+    larger than the memory limit are backed by temporary files instead of anonymous memory, so inputs larger than
+    RAM are paged to disk by the operating system.
+
+    Keys are encoded the same way as Snapshot keys.
+
+    Logic ported from the 2.7 Python branch: cpython/Objects/dictobject.c
+    """
+
+    def __init__(self, bits=None, sizebits=None, memory=1 << 27, directory=None):
+        """
+        Creates a new Stream.
+
+        Args:
+            bits: C long size in bits used for hashing, defaults to the current platform
+            sizebits: C size_t size in bits used for probing, defaults to bits if set, otherwise the current platform
+            memory: maximum size in bytes of each column kept in memory, larger columns are stored in temporary files
+            directory: temporary file directory, defaults to the system temporary directory
+        """
+
+        self.bits = bits
+        self.sizebits = sizebits
+        self.sizemask = (1 << (sizebits or (bits if bits else SIZEBITS))) - 1
+
+        self.memory, self.directory = memory, directory
+
+        # Python 2 dict default size
+        self.mask = Keys.MINSIZE - 1
+        self.table, self.hashes = Column(self.mask + 1, self), Column(self.mask + 1, self)
+
+        # Entry columns grow as keys are added
+        self.offsets, self.positions = Column(Keys.MINSIZE, self), Column(Keys.MINSIZE, self)
+
+        # Encoded keys
+        self.data, self.end = tempfile.TemporaryFile(dir=directory), 0
+
+        # Number of distinct keys and number of input keys
+        self.count, self.total = 0, 0
+
+    def __enter__(self):
+        """
+        Context manager entry.
+
+        Returns:
+            self
+        """
+
+        return self
+
+    def __exit__(self, *args):
+        """
+        Releases storage on context manager exit.
+
+        Args:
+            *args: exception details
+        """
+
+        self.close()
+
+    def __len__(self):
+        """
+        Number of distinct keys.
+
+        Returns:
+            length
+        """
+
+        return self.count
+
+    def __iter__(self):
+        """
+        Iterates over distinct keys in Python 2.7 order. Each key is read back from the data file.
+
+        Returns:
+            iterator
+        """
+
+        return (self.key(x) for x in self.entries())
+
+    def add(self, key):
+        """
+        Adds a key to the stream.
+
+        Args:
+            key: key to add
+        """
+
+        self.extend([key])
+
+    def extend(self, keys):
+        """
+        Adds keys to the stream in order. Keys equal to an earlier key are ignored, as they would be by a dict.
+
+        Method: static int insertdict_by_entry(register PyDictObject *mp, PyObject *key, long hash, PyDictEntry *ep,
+                                               PyObject *value)
+
+        Args:
+            keys: iterable of keys
+        """
+
+        bits, sizemask = self.bits, self.sizemask
+        table, hashes, mask = self.table.values, self.hashes.values, self.mask
+
+        for key in keys:
+            self.total += 1
+
+            h = Hash.hash(key, bits)
+
+            # Inlined lookup, there are no dummy slots since keys are never removed
+            perturb = h & sizemask
+            i = perturb & mask
+
+            while table[i] and not (hashes[i] == h and self.key(table[i] - 1) == key):
+                i = ((i << 2) + i + perturb + 1) & mask
+                perturb >>= Keys.PERTURB_SHIFT
+
+            if table[i]:
+                continue
+
+            self.append(key)
+
+            table[i] = self.count
+            hashes[i] = h
+
+            # Resize dict if active slots are at 2/3 capacity
+            if self.count * 3 >= (mask + 1) * 2:
+                self.resize()
+                table, hashes, mask = self.table.values, self.hashes.values, self.mask
+
+    def entries(self):
+        """
+        Iterates over entry numbers in Python 2.7 order.
+
+        Returns:
+            iterator
+        """
+
+        return (x - 1 for x in self.table.values if x)
+
+    def indices(self):
+        """
+        Iterates over the input position of each distinct key in Python 2.7 order. For duplicate keys, the position
+        of the first occurrence is used.
+
+        Returns:
+            iterator
+        """
+
+        positions = self.positions.values
+        return (positions[x] for x in self.entries())
+
+    def slots(self):
+        """
+        Iterates over the (input position, slot index) of each distinct key in Python 2.7 order.
+
+        Returns:
+            iterator
+        """
+
+        positions = self.positions.values
+        return ((positions[x - 1], i) for i, x in enumerate(self.table.values) if x)
+
+    def key(self, x):
+        """
+        Reads and decodes the key for entry x.
+
+        Args:
+            x: entry number
+
+        Returns:
+            key
+        """
+
+        offsets = self.offsets.values
+        start = offsets[x]
+        end = offsets[x + 1] if x + 1 < self.count else self.end
+
+        self.data.seek(start)
+        data = self.data.read(end - start)
+
+        return Snapshot.unpack(data[:1], data[1:])
+
+    def append(self, key):
+        """
+        Stores a new distinct key.
+
+        Args:
+            key: key to store
+        """
+
+        if self.count == len(self.offsets.values):
+            self.offsets = self.offsets.grow(self.count * 2)
+            self.positions = self.positions.grow(self.count * 2)
+
+        self.offsets.values[self.count] = self.end
+        self.positions.values[self.count] = self.total - 1
+        self.count += 1
+
+        tag, data = Snapshot.encode(key)
+
+        self.data.seek(self.end)
+        self.data.write(tag)
+        self.data.write(data)
+
+        self.end += len(data) + 1
+
+    def resize(self):
+        """
+        Resizes the table and re-inserts all keys in slot order.
+
+        Method: static int dictresize(PyDictObject *mp, Py_ssize_t minused)
+        """
+
+        # Python 2 dict increases by a factor of 4 for small dicts, 2 for larger ones
+        request = self.count * (2 if self.count > 50000 else 4)
+
+        newsize = Keys.MINSIZE
+        while newsize <= request:
+            newsize <<= 1
+
+        mask, sizemask = newsize - 1, self.sizemask
+        table, hashes = Column(newsize, self), Column(newsize, self)
+        new, cache = table.values, hashes.values
+
+        # Cached hashes are reused, keys are never rehashed or compared
+        old = self.hashes.values
+        for x, entry in enumerate(self.table.values):
+            if entry:
+                h = old[x]
+
+                perturb = h & sizemask
+                i = perturb & mask
+
+                while new[i]:
+                    i = ((i << 2) + i + perturb + 1) & mask
+                    perturb >>= Keys.PERTURB_SHIFT
+
+                new[i] = entry
+                cache[i] = h
+
+        self.table.close()
+        self.hashes.close()
+
+        self.table, self.hashes, self.mask = table, hashes, mask
+
+    def close(self):
+        """
+        Releases all storage. Temporary files are deleted.
+        """
+
+        for column in (self.table, self.hashes, self.offsets, self.positions):
+            column.close()
+
+        self.data.close()
+
+class Column(object):
+    """
+    Zero filled int64 array. Columns larger than the stream memory limit are backed by a temporary file.
+    """
+
+    def __init__(self, size, stream):
+        """
+        Allocates a new column.
+
+        Args:
+            size: number of elements
+            stream: parent Stream
+        """
+
+        self.stream = stream
+
+        # mmap doesn't support empty maps
+        length = max(size, 1) * 8
+
+        self.file = None
+        if length > stream.memory:
+            self.file = tempfile.TemporaryFile(dir=stream.directory)
+            self.file.truncate(length)
+
+        self.mmap = mmap.mmap(self.file.fileno() if self.file else -1, length)
+        self.values = memoryview(self.mmap).cast("q")
+
+    def grow(self, size):
+        """
+        Creates a larger copy of this column and releases this column.
+
+        Args:
+            size: new number of elements
+
+        Returns:
+            Column
+        """
+
+        column = Column(size, self.stream)
+        column.values[:len(self.values)] = self.values
+
+        self.close()
+
+        return column
+
+    def close(self):
+        """
+        Releases the mapped buffer and temporary file.
+        """
+
+        if self.mmap:
+            self.values.release()
+            self.mmap.close()
+
+            if self.file:
+                self.file.close()
+
+            self.values, self.mmap, self.file = None, None, None
@@ -0,0 +1,305 @@
+"""
+Compatibility methods to support Python 2.7 style repr strings in Python 3.X+
+
+This is designed for compatibility not performance.
+"""
+
+import io
+
+# pylint: disable = E0401
+from .hash import BITS
+from .key import Keys
+
+def repr27(value, bits=None):
+    """
+    Builds the Python 2.7 repr string of value.
+
+    Args:
+        value: input value
+        bits: C long size in bits (32 or 64), defaults to the current platform
+
+    Returns:
+        Python 2.7 repr string
+    """
+
+    fp = io.StringIO()
+    Text(fp, bits).write(value)
+
+    return fp.getvalue()
+
+def isascii(value):
+    """
+    Checks if a string only has ASCII characters.
+
+    Args:
+        value: input string
+
+    Returns:
+        True if value is ASCII, False otherwise
+    """
+
+    # str.isascii is only available in Python 3.7+
+    try:
+        value.encode("ascii")
+        return True
+    except UnicodeEncodeError:
+        return False
+
+# pylint: disable = E1101
+if hasattr(str, "isascii"):
+    isascii = str.isascii
+
+class Text(object):
+    """
+    Writes Python 2.7 repr strings to a text stream. Output is buffered in chunks and written as it's generated,
+    so large containers are never fully built up as a string in memory.
+
+    Dicts and sets are written in Python 2.7 iteration order. Plain Python 3 dicts and sets are ordered as if their
+    keys had been added to a Python 2.7 dict/set in their current iteration order.
+
+    Logic ported from the 2.7 Python branch: cpython/Objects/dictobject.c, setobject.c, listobject.c, tupleobject.c,
+    stringobject.c, unicodeobject.c
+    """
+
+    # Number of pieces buffered before each write
+    BUFFER = 4096
+
+    def __init__(self, fp, bits=None):
+        """
+        Creates a new writer.
+
+        Args:
+            fp: text stream, any object with a write method
+            bits: C long size in bits (32 or 64) used to determine when ints are written as longs
+        """
+
+        self.fp = fp
+        self.bits = bits
+
+        # C long range, ints outside of this range are written as longs
+        self.maximum = (1 << ((bits if bits else BITS) - 1)) - 1
+        self.minimum = -self.maximum - 1
+
+        # Buffered output pieces
+        self.parts = []
+
+        # Ids of containers currently being written, used to detect recursive containers
+        self.active = set()
+
+    def write(self, value):
+        """
+        Writes the Python 2.7 repr string of value and flushes the output.
+
+        Args:
+            value: input value
+        """
+
+        self.value(value)
+        self.flush()
+
+    def flush(self):
+        """
+        Writes buffered output to the stream.
+        """
+
+        if self.parts:
+            self.fp.write("".join(self.parts))
+            del self.parts[:]
+
+    def append(self, string):
+        """
+        Buffers a piece of output, flushes the buffer when full.
+
+        Args:
+            string: output string
+        """
+
+        self.parts.append(string)
+        if len(self.parts) >= Text.BUFFER:
+            self.flush()
+
+    def value(self, value):
+        """
+        Writes the Python 2.7 repr string of value.
+
+        Args:
+            value: input value
+        """
+
+        string = self.text(value)
+        if string is not None:
+            self.append(string)
+            return
+
+        # Py_ReprEnter: recursive containers are written as ...
+        if id(value) in self.active:
+            self.append(self.recursive(value))
+            return
+
+        self.active.add(id(value))
+        try:
+            self.container(value)
+        finally:
+            self.active.discard(id(value))
+
+    def text(self, value):
+        """
+        Builds the Python 2.7 repr string of a scalar value. Containers are written element by element, None is
+        returned for those.
+
+        Method: PyObject *PyString_Repr(PyObject *obj, int smartquotes)
+        Method: static PyObject *unicode_repr(PyObject *unicode)
+        Method: static PyObject *long_repr(PyObject *v)
+
+        Args:
+            value: input value
+
+        Returns:
+            repr string or None if value is a container
+        """
+
+        if isinstance(value, str):
+            # ASCII strings match Python 2.7 str, anything else can only be a Python 2.7 unicode string.
+            # ascii() escapes non-ASCII characters as \x, \u and \U sequences with the same quoting rules.
+            return repr(value) if isascii(value) else "u" + ascii(value)
+
+        if isinstance(value, int):
+            # Values outside of the C long range are Python 2.7 longs
+            if isinstance(value, bool) or self.minimum <= value <= self.maximum:
+                return repr(value)
+
+            return "%dL" % value
+
+        if isinstance(value, bytes):
+            # Python 2.7 str, same escaping as bytes without the prefix
+            return repr(value)[1:]
+
+        if isinstance(value, (dict, set, frozenset, list, tuple)):
+            return None
+
+        return repr(value)
+
+    def container(self, value):
+        """
+        Writes the Python 2.7 repr string of a container.
+
+        Method: static PyObject *dict_repr(PyDictObject *mp)
+        Method: static PyObject *set_repr(PySetObject *so)
+        Method: static PyObject *list_repr(PyListObject *v)
+        Method: static PyObject *tuplerepr(PyTupleObject *v)
+
+        Args:
+            value: dict, set, frozenset, list or tuple
+        """
+
+        if isinstance(value, dict):
+            text, parts, separator = self.text, self.parts, ""
+
+            self.append("{")
+            for k, v in self.items(value):
+                key, item = text(k), text(v)
+
+                # Scalar items are written as a single piece
+                if key is not None and item is not None:
+                    parts.append(separator + key + ": " + item)
+                    if len(parts) >= Text.BUFFER:
+                        self.flush()
+                else:
+                    self.append(separator)
+                    self.value(k)
+                    self.append(": ")
+                    self.value(v)
+
+                separator = ", "
+
+            self.append("}")
+        elif isinstance(value, (set, frozenset)):
+            self.append("%s([" % ("frozenset" if isinstance(value, frozenset) else "set"))
+            self.sequence(self.keys(value))
+            self.append("])")
+        elif isinstance(value, list):
+            self.append("[")
+            self.sequence(value)
+            self.append("]")
+        else:
+            self.append("(")
+            self.sequence(value)
+            self.append(",)" if len(value) == 1 else ")")
+
+    def sequence(self, values):
+        """
+        Writes each value separated by a comma.
+
+        Args:
+            values: iterable
+        """
+
+        text, parts, separator = self.text, self.parts, ""
+
+        for v in values:
+            string = text(v)
+            if string is not None:
+                parts.append(separator + string)
+                if len(parts) >= Text.BUFFER:
+                    self.flush()
+            else:
+                self.append(separator)
+                self.value(v)
+
+            separator = ", "
+
+    def keys(self, value):
+        """
+        Gets keys of a dict or set in Python 2.7 iteration order.
+
+        Args:
+            value: dict or set
+
+        Returns:
+            iterable of keys
+        """
+
+        # Python 2.7 style containers iterate in order
+        if isinstance(getattr(value, "keylist", None), Keys):
+            return iter(value)
+
+        keylist = Keys(self.bits)
+        keylist.extend(list(value))
+
+        return keylist
+
+    def items(self, value):
+        """
+        Gets (key, value) items of a dict in Python 2.7 iteration order.
+
+        Args:
+            value: dict
+
+        Returns:
+            iterable of (key, value)
+        """
+
+        if isinstance(getattr(value, "keylist", None), Keys):
+            return value.iteritems()
+
+        get = dict.__getitem__
+        return ((k, get(value, k)) for k in self.keys(value))
+
+    def recursive(self, value):
+        """
+        Placeholder written for a container that contains itself.
+
+        Args:
+            value: container
+
+        Returns:
+            placeholder string
+        """
+
+        if isinstance(value, dict):
+            return "{...}"
+
+        if isinstance(value, (set, frozenset)):
+            return "%s(...)" % ("frozenset" if isinstance(value, frozenset) else "set")
+
+        return "[...]" if isinstance(value, list) else "(...)"
@@ -0,0 +1,276 @@
+"""
+Compatibility methods to support thread-safe Python 2.7 style dicts and sets in Python 3.X+
+
+This is designed for compatibility not performance.
+"""
+
+import functools
+import threading
+
+# pylint: disable = E0401
+from .dict import Dict
+from .set import Set
+
+def mutation(method):
+    """
+    Wraps a method that modifies a ThreadSafeDict or ThreadSafeSet. The method runs with the write lock held, so the
+    backing container and keylist are always updated together. The ordered snapshot is discarded once the method
+    completes.
+
+    Args:
+        method: method to wrap
+
+    Returns:
+        wrapped method
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.snapshot = None
+
+    return wrapper
+
+class ThreadSafeDict(Dict):
+    """
+    Dict that can be shared by threads. Writers take a lock. Readers iterate over an immutable snapshot of the keys,
+    hashes and values in Python 2.7 order. The snapshot is built once after each change and shared by all readers.
+    Readers don't take the lock while the snapshot is current, so they never block each other.
+
+    Single key operations such as lookups, membership checks and len are served by the backing dict.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Creates a new ThreadSafeDict.
+
+        Args:
+            *args: args
+            *kwargs: keyword args
+        """
+
+        # Write lock and (keys, hashes, values) snapshot in Python 2.7 order
+        self.lock, self.snapshot = threading.RLock(), None
+
+        super(ThreadSafeDict, self).__init__(*args, **kwargs)
+
+    def __reduce__(self):
+        """
+        Pickles items in Python 2.7 iteration order, which matches Python 2.7 deserialization logic.
+
+        Returns:
+            reduce tuple
+        """
+
+        keys, _, values = self.ordered()
+        return (self.__class__, (list(zip(keys, values)),))
+
+    # Methods that modify a Dict
+    __setitem__ = mutation(Dict.__setitem__)
+    __delitem__ = mutation(Dict.__delitem__)
+    update = mutation(Dict.update)
+    clear = mutation(Dict.clear)
+    pop = mutation(Dict.pop)
+    popitem = mutation(Dict.popitem)
+
+    def __iter__(self):
+        """
+        Iterates over keys in the current snapshot.
+
+        Returns:
+            iterator
+        """
+
+        return iter(self.ordered()[0])
+
+    def ordered(self):
+        """
+        Gets the current snapshot, building it if this Dict changed since the last snapshot.
+
+        Returns:
+            (keys, hashes, values) in Python 2.7 order
+        """
+
+        snapshot = self.snapshot
+        if snapshot is None:
+            with self.lock:
+                if self.snapshot is None:
+                    keys, hashes = self.keylist.entries()
+                    self.snapshot = (keys, hashes, list(map(super(ThreadSafeDict, self).__getitem__, keys)))
+
+                snapshot = self.snapshot
+
+        return snapshot
+
+    def copy(self):
+        """
+        Copies the current snapshot. The keylist is built the same way Dict.copy builds it.
+
+        Returns:
+            copy of self
+        """
+
+        keys, hashes, values = self.ordered()
+
+        new = self.__class__()
+        new.keylist.merge(keys, hashes)
+        dict.update(new, zip(keys, values))
+
+        return new
+
+    def keys(self):
+        """
+        Returns keys ordered using Python 2.7's iteration algorithm.
+
+        Returns:
+          list of keys
+        """
+
+        return list(self.ordered()[0])
+
+    def values(self):
+        """
+        Returns values ordered using Python 2.7's iteration algorithm.
+
+        Returns:
+          list of values
+        """
+
+        return list(self.ordered()[2])
+
+    def items(self):
+        """
+        Returns items ordered using Python 2.7's iteration algorithm.
+
+        Returns:
+          list of items
+        """
+
+        keys, _, values = self.ordered()
+        return list(zip(keys, values))
+
+    def iterkeys(self):
+        """
+        Backwards compat method for Python 2 dict
+
+        Returns:
+            iterator over keys
+        """
+
+        return iter(self)
+
+    def itervalues(self):
+        """
+        Backwards compat method for Python 2 dict
+
+        Returns:
+            iterator over values
+        """
+
+        return iter(self.ordered()[2])
+
+    def iteritems(self):
+        """
+        Backwards compat method for Python 2 dict
+
+        Returns:
+            iterator over items
+        """
+
+        keys, _, values = self.ordered()
+        return zip(keys, values)
+
+class ThreadSafeSet(Set):
+    """
+    Set that can be shared by threads. Writers take a lock. Readers iterate over an immutable snapshot of the keys
+    and hashes in Python 2.7 order. The snapshot is built once after each change and shared by all readers. Readers
+    don't take the lock while the snapshot is current, so they never block each other.
+
+    Membership checks and len are served by the backing set.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Creates a new ThreadSafeSet.
+
+        Args:
+            *args: args
+            *kwargs: keyword args
+        """
+
+        # Write lock and (keys, hashes) snapshot in Python 2.7 order
+        self.lock, self.snapshot = threading.RLock(), None
+
+        super(ThreadSafeSet, self).__init__(*args, **kwargs)
+
+    def __reduce__(self):
+        """
+        Pickles elements in Python 2.7 iteration order, which matches Python 2.7 deserialization logic.
+
+        Returns:
+            reduce tuple
+        """
+
+        return (self.__class__, (list(self.ordered()[0]),))
+
+    # Methods that modify a Set
+    add = mutation(Set.add)
+    remove = mutation(Set.remove)
+    discard = mutation(Set.discard)
+    update = mutation(Set.update)
+    clear = mutation(Set.clear)
+    pop = mutation(Set.pop)
+    intersection_update = mutation(Set.intersection_update)
+    difference_update = mutation(Set.difference_update)
+    symmetric_difference_update = mutation(Set.symmetric_difference_update)
+    __ior__ = mutation(Set.__ior__)
+    __iand__ = mutation(Set.__iand__)
+    __isub__ = mutation(Set.__isub__)
+    __ixor__ = mutation(Set.__ixor__)
+
+    def __iter__(self):
+        """
+        Iterates over elements in the current snapshot.
+
+        Returns:
+            iterator
+        """
+
+        return iter(self.ordered()[0])
+
+    def ordered(self):
+        """
+        Gets the current snapshot, building it if this Set changed since the last snapshot.
+
+        Returns:
+            (keys, hashes) in Python 2.7 order
+        """
+
+        snapshot = self.snapshot
+        if snapshot is None:
+            with self.lock:
+                if self.snapshot is None:
+                    self.snapshot = self.keylist.entries()
+
+                snapshot = self.snapshot
+
+        return snapshot
+
+    def copy(self):
+        """
+        Copies the current snapshot. The keylist is built the same way Set.copy builds it.
+
+        Returns:
+            copy of self
+        """
+
+        keys, hashes = self.ordered()
+
+        new = self.__class__()
+        new.keylist.merge(keys, hashes)
+        set.update(new, keys)
+
+        return new
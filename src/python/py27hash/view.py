@@ -0,0 +1,385 @@
+"""
+Compatibility methods to support Python 2.7 style dict views in Python 3.X+
+
+This is designed for compatibility not performance.
+"""
+
+# pylint: disable = E0401
+from .set import Set
+from .text import repr27
+
+class View(object):
+    """
+    Base dict view. Views are dynamic, they walk the backing Dict's key table each time they are iterated.
+
+    Logic ported from the 2.7 Python branch: cpython/Objects/dictobject.c
+    """
+
+    # Python 2.7 type name used in repr strings, set by each view type
+    NAME = None
+
+    def __init__(self, mapping):
+        """
+        Creates a new view.
+
+        Args:
+            mapping: Dict
+        """
+
+        self.mapping = mapping
+
+    def __len__(self):
+        """
+        Number of entries in the backing Dict.
+
+        Returns:
+            length
+        """
+
+        return len(self.mapping)
+
+    def __iter__(self):
+        """
+        Iterates over the backing Dict's keys in Python 2.7 order. Views over values and items override this.
+
+        Returns:
+            iterator
+        """
+
+        return self.mapping.iterkeys()
+
+    def __repr__(self):
+        """
+        Creates a string version of this view.
+
+        Returns:
+            string
+        """
+
+        return "%s(%s)" % (self.NAME, repr27(list(self), self.mapping.bits))
+
+class SetView(View):
+    """
+    Base view for keys and items. Supports set operations, results are returned as a Set.
+
+    Method: static PyObject *dictviews_sub(PyObject* self, PyObject *other)
+    Method: static PyObject *dictviews_and(PyObject* self, PyObject *other)
+    Method: static PyObject *dictviews_or(PyObject* self, PyObject *other)
+    Method: static PyObject *dictviews_xor(PyObject* self, PyObject *other)
+    """
+
+    def __eq__(self, other):
+        """
+        Views are equal to views and sets with the same elements.
+
+        Args:
+            other: other view or set
+
+        Returns:
+            True if equal, False otherwise
+        """
+
+        if isinstance(other, (set, frozenset, SetView)):
+            return len(self) == len(other) and all(x in other for x in self)
+
+        return NotImplemented
+
+    def __ne__(self, other):
+        """
+        Inverse of __eq__.
+
+        Args:
+            other: other view or set
+
+        Returns:
+            True if not equal, False otherwise
+        """
+
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    # Views aren't hashable
+    __hash__ = None
+
+    def __sub__(self, other):
+        """
+        Elements in this view that aren't in other.
+
+        Args:
+            other: iterable
+
+        Returns:
+            Set
+        """
+
+        return SetView.sub(self, other)
+
+    def __rsub__(self, other):
+        """
+        Elements in other that aren't in this view.
+
+        Args:
+            other: iterable
+
+        Returns:
+            Set
+        """
+
+        return SetView.sub(other, self)
+
+    def __and__(self, other):
+        """
+        Elements in both this view and other.
+
+        Args:
+            other: iterable
+
+        Returns:
+            Set
+        """
+
+        return SetView.intersection(self, other)
+
+    def __rand__(self, other):
+        """
+        Elements in both other and this view.
+
+        Args:
+            other: iterable
+
+        Returns:
+            Set
+        """
+
+        return SetView.intersection(other, self)
+
+    def __or__(self, other):
+        """
+        Elements in either this view or other.
+
+        Args:
+            other: iterable
+
+        Returns:
+            Set
+        """
+
+        return SetView.union(self, other)
+
+    def __ror__(self, other):
+        """
+        Elements in either other or this view.
+
+        Args:
+            other: iterable
+
+        Returns:
+            Set
+        """
+
+        return SetView.union(other, self)
+
+    def __xor__(self, other):
+        """
+        Elements in either this view or other but not both.
+
+        Args:
+            other: iterable
+
+        Returns:
+            Set
+        """
+
+        return SetView.xor(self, other)
+
+    def __rxor__(self, other):
+        """
+        Elements in either other or this view but not both.
+
+        Args:
+            other: iterable
+
+        Returns:
+            Set
+        """
+
+        return SetView.xor(other, self)
+
+    def isdisjoint(self, other):
+        """
+        Checks if this view has no elements in common with other. Matches the Python 3 view method.
+
+        Args:
+            other: iterable
+
+        Returns:
+            True if there are no common elements, False otherwise
+        """
+
+        # Iterate over the shorter object (only if other is a set, because PySequence_Contains may be expensive)
+        if isinstance(other, (set, frozenset, SetView)) and len(other) > len(self):
+            this, other = other, self
+        else:
+            this = self
+
+        return not any(x in this for x in other)
+
+    @staticmethod
+    def sub(left, right):
+        """
+        Elements in left that aren't in right.
+
+        Args:
+            left: iterable
+            right: iterable
+
+        Returns:
+            Set
+        """
+
+        result = Set(left)
+        result.difference_update(right)
+
+        return result
+
+    @staticmethod
+    def intersection(left, right):
+        """
+        Elements in both left and right. The smaller operand is iterated when both are sets.
+
+        Args:
+            left: iterable
+            right: iterable
+
+        Returns:
+            Set
+        """
+
+        result = Set(left)
+        result.intersection_update(right)
+
+        return result
+
+    @staticmethod
+    def union(left, right):
+        """
+        Elements in either left or right.
+
+        Args:
+            left: iterable
+            right: iterable
+
+        Returns:
+            Set
+        """
+
+        result = Set(left)
+        result.update(right)
+
+        return result
+
+    @staticmethod
+    def xor(left, right):
+        """
+        Elements in either left or right but not both.
+
+        Args:
+            left: iterable
+            right: iterable
+
+        Returns:
+            Set
+        """
+
+        result = Set(left)
+        result.symmetric_difference_update(right)
+
+        return result
+
+class KeysView(SetView):
+    """
+    Dynamic view of a Dict's keys in Python 2.7 iteration order.
+    """
+
+    NAME = "dict_keys"
+
+    def __contains__(self, key):
+        """
+        Checks if key is in this view.
+
+        Args:
+            key: key to check
+
+        Returns:
+            True if found, False otherwise
+        """
+
+        return key in self.mapping
+
+class ValuesView(View):
+    """
+    Dynamic view of a Dict's values in Python 2.7 iteration order.
+    """
+
+    NAME = "dict_values"
+
+    def __iter__(self):
+        """
+        Iterates over the backing Dict in Python 2.7 order.
+
+        Returns:
+            iterator
+        """
+
+        return self.mapping.itervalues()
+
+    def __contains__(self, value):
+        """
+        Checks if value is in this view.
+
+        Args:
+            value: value to check
+
+        Returns:
+            True if found, False otherwise
+        """
+
+        return any(x is value or x == value for x in self)
+
+class ItemsView(SetView):
+    """
+    Dynamic view of a Dict's (key, value) items in Python 2.7 iteration order.
+    """
+
+    NAME = "dict_items"
+
+    def __iter__(self):
+        """
+        Iterates over the backing Dict in Python 2.7 order.
+
+        Returns:
+            iterator
+        """
+
+        return self.mapping.iteritems()
+
+    def __contains__(self, item):
+        """
+        Checks if item is in this view.
+
+        Args:
+            item: item to check
+
+        Returns:
+            True if found, False otherwise
+        """
+
+        if not isinstance(item, tuple) or len(item) != 2:
+            return False
+
+        key, value = item
+        if key not in self.mapping:
+            return False
+
+        x = self.mapping[key]
+        return x is value or x == value
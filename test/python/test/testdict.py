@@ -7,10 +7,19 @@ import unittest
 
 from py27hash.dict import Dict
 from py27hash.hash import hash27
+from py27hash.set import Set
 
 is_32bit = sys.maxsize < 2**32
 
 
+class Dict32(Dict):
+    bits = 32
+
+
+class Dict64(Dict):
+    bits = 64
+
+
 class TestDict(unittest.TestCase):
     def test_small(self):
         d = Dict()
@@ -45,6 +54,64 @@ class TestDict(unittest.TestCase):
         expected = 245633326 if is_32bit else 7766555225202364718
         self.assertEqual(hash27("".join([str(k) for k in d])), expected)
 
+    def test_longs(self):
+        d = Dict64()
+        for k in [2**64, 2**100 + 7, -2**70, 2**127 - 1, 5, float("inf"), 2**65]:
+            d[k] = 1
+
+        self.assertEqual(d.keys(), [-2**70, 2**64, 2**65, 5, 2**100 + 7, float("inf"), 2**127 - 1])
+
+    def test_iter(self):
+        d = Dict()
+        for x in range(500):
+            d[str(x)] = x
+
+        del d["300"]
+
+        self.assertEqual(list(d.iterkeys()), d.keys())
+        self.assertEqual(list(d.itervalues()), d.values())
+        self.assertEqual(list(d.iteritems()), d.items())
+        self.assertEqual(list(d.iteritems()), [(k, d[k]) for k in d])
+
+    def test_views(self):
+        d = Dict()
+        for x in range(0, 200, 8):
+            d[x] = x
+
+        keys, values, items = d.viewkeys(), d.viewvalues(), d.viewitems()
+
+        # Views are dynamic
+        d[1000] = -1
+        self.assertEqual(len(keys), 26)
+        self.assertEqual(list(keys), d.keys())
+        self.assertEqual(list(values), d.values())
+        self.assertEqual(list(items), d.items())
+        self.assertTrue(1000 in keys and -1 in values and (1000, -1) in items)
+        self.assertFalse((1000, 1) in items)
+        del d[1000]
+
+        # Set operations return results in Python 2.7 order
+        o = Set(range(0, 400, 12))
+        self.assertEqual(list(keys & o), [0, 192, 48, 72, 96, 144, 168, 24, 120])
+        self.assertEqual(list(keys - o), [128, 8, 152, 32, 176, 40, 136, 56, 64, 160, 80, 184, 88, 16, 104, 112])
+        self.assertEqual(list(o - keys), [384, 132, 264, 12, 276, 156, 288, 36, 300, 180, 312, 60, 324, 396, 204, 336, 84,
+                                          216, 348, 228, 360, 108, 240, 372, 252])
+        self.assertEqual(list(keys ^ o)[:10], [384, 128, 132, 8, 396, 216, 276, 152, 156, 312])
+        self.assertEqual(list(keys | o)[:10], [0, 128, 132, 8, 192, 144, 24, 384, 276, 152])
+        self.assertEqual(list(items & [(8, 8), (16, 3)]), [(8, 8)])
+
+        self.assertEqual(keys, set(d))
+        self.assertFalse(keys.isdisjoint([8]))
+
+    def test_falsy(self):
+        d = Dict()
+        d[0] = 1
+        d[""] = 2
+        d[()] = 3
+
+        self.assertEqual(list(d), [0, "", ()])
+        self.assertEqual(d.popitem(), (0, 1))
+
     def test_merge(self):
         # Build list of (key, value) pairs to preserve insertion ordering
         d = []
@@ -127,6 +194,26 @@ class TestDict(unittest.TestCase):
         expected = -1829309066 if is_32bit else 1141231293364439680
         self.assertEqual(hash27("".join(d)), expected)
 
+    def test_copywrite(self):
+        d = Dict()
+
+        for x in range(500):
+            d[str(x)] = x
+
+        # Copies share a table until either side changes
+        a, b = d.copy(), d.copy()
+        a["a"] = 1
+        del b["1"]
+        d["d"] = 2
+        c = a.copy()
+
+        self.assertEqual((len(a), len(b), len(c), len(d)), (501, 499, 501, 501))
+        self.assertEqual(c.items(), a.copy().items())
+
+        expected = [-466531354, 1140837306, -1411363225, -1438429572] if is_32bit else \
+                   [5430437930270497812, 6467357011207200524, 7481970269605613159, -349135787536721294]
+        self.assertEqual([hash27("".join(x)) for x in (a, b, d, c)], expected)
+
     def test_fromkeys(self):
         s = []
 
@@ -150,6 +237,23 @@ class TestDict(unittest.TestCase):
         expected = 1667650642 if is_32bit else -2555609460481043374
         self.assertEqual(hash27("".join([str(x) for x in d])), expected)
 
+    def test_fromkeysdict(self):
+        s = Dict()
+        for x in range(5):
+            s[x * 8] = None
+
+        d = Dict.fromkeys(s)
+        self.assertEqual(list(d), [0, 8, 24, 16, 32])
+
+        d[100] = None
+        self.assertEqual(list(d), [0, 32, 100, 8, 16, 24])
+
+    def test_kwargs(self):
+        d = Dict(a1=1, b2=2, c3=3, d4=4, e5=5, f6=6, g7=7, h8=8, i9=9, j10=10, k11=11)
+
+        expected = 1532827088 if is_32bit else 7908567856275330512
+        self.assertEqual(hash27("".join(d)), expected)
+
     def test_pop(self):
         d = Dict()
 
@@ -168,3 +272,45 @@ class TestDict(unittest.TestCase):
 
         expected = 267158528 if is_32bit else -434207861779954688
         self.assertEqual(hash27("".join(d)), expected)
+
+    def test_bits(self):
+        d = Dict32()
+
+        for x in range(500):
+            d[str(x)] = x
+
+        del d["300"]
+
+        # Pickle and reload object
+        d = pickle.loads(pickle.dumps(d))
+
+        # Order matches 32-bit Python 2.7 builds on all platforms
+        self.assertEqual(hash27("".join(d), 32), -1296777260)
+        self.assertIsInstance(d.copy(), Dict32)
+
+    def test_none(self):
+        d = Dict()
+        d["a"] = 1
+
+        # None has no Python 2.7 hash, it's rejected before the Dict changes
+        with self.assertRaises(TypeError):
+            d[None] = 2
+
+        self.assertEqual(d.items(), [("a", 1)])
+        self.assertEqual(len(d), len(list(d)))
+
+    def test_updateerror(self):
+        d = Dict()
+
+        # Items before the failing key are kept, the same as Python 2.7
+        with self.assertRaises(TypeError):
+            d.update([(1, 2), ([], 3), (4, 5)])
+
+        self.assertEqual(d.items(), [(1, 2)])
+        self.assertEqual(d.values(), [2])
+
+        with self.assertRaises(TypeError):
+            d.update({"a": 1, None: 2})
+
+        self.assertEqual(dict(d.items()), {1: 2, "a": 1})
+        self.assertEqual(len(d.values()), len(d))
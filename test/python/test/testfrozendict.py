@@ -0,0 +1,68 @@
+# pylint: disable = C0111,W0622,E0401
+
+import pickle
+import unittest
+
+from py27hash.dict import Dict
+from py27hash.frozendict import FrozenDict
+from py27hash.hash import hash27
+from py27hash.set import Set
+
+
+class TestFrozenDict(unittest.TestCase):
+    def test_order(self):
+        d = Dict()
+        for x in range(100):
+            d[str(x)] = x
+
+        f = FrozenDict(d)
+
+        self.assertEqual(f.keys(), Dict(d).keys())
+        self.assertEqual(f.items(), Dict(d).items())
+        self.assertEqual(FrozenDict.fromkeys(d).keys(), Dict.fromkeys(d).keys())
+
+    def test_fromkeys(self):
+        keys = [x * 7 for x in range(6)]
+
+        # Python 2.7 order, lists are added one at a time and sets and dicts are presized
+        self.assertEqual(FrozenDict.fromkeys(keys).keys(), [0, 35, 7, 14, 21, 28])
+        self.assertEqual(FrozenDict.fromkeys(Set(keys)).keys(), [0, 35, 21, 7, 28, 14])
+
+        for n in (5, 11, 22, 50, 700):
+            keys = [x * 7 for x in range(n)]
+            for iterable in (keys, Set(keys), Dict.fromkeys(keys)):
+                self.assertEqual(FrozenDict.fromkeys(iterable, 1).items(), Dict.fromkeys(iterable, 1).items())
+
+    def test_hash(self):
+        f = FrozenDict(a=1, b=2)
+
+        # Hashes as a frozenset of items
+        self.assertEqual(hash27(f), hash27(frozenset([("a", 1), ("b", 2)])))
+        self.assertEqual(hash(f), hash(frozenset([("a", 1), ("b", 2)])))
+
+        d = Dict()
+        d[f] = 1
+        self.assertEqual(d[FrozenDict(b=2, a=1)], 1)
+
+    def test_immutable(self):
+        f = FrozenDict(a=1)
+
+        for method, args in [("__setitem__", ("b", 2)), ("__delitem__", ("a",)), ("update", ({"b": 2},)),
+                             ("clear", ()), ("pop", ("a",)), ("popitem", ()), ("setdefault", ("b", 2)),
+                             ("__ior__", ({"b": 2},))]:
+            with self.assertRaises(TypeError):
+                getattr(f, method)(*args)
+
+        with self.assertRaises(TypeError):
+            f |= {"b": 2}
+
+        self.assertEqual(f, {"a": 1})
+        self.assertIs(f.copy(), f)
+
+    def test_pickle(self):
+        f = FrozenDict((str(x), x) for x in range(100))
+
+        loaded = pickle.loads(pickle.dumps(f))
+        self.assertIsInstance(loaded, FrozenDict)
+        self.assertEqual(loaded.keys(), pickle.loads(pickle.dumps(Dict(f))).keys())
+        self.assertEqual(hash27(loaded), hash27(f))
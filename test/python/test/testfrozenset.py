@@ -0,0 +1,91 @@
+# pylint: disable = C0111,W0622,E0401
+
+import pickle
+import unittest
+
+from collections import OrderedDict
+
+from py27hash.dict import Dict
+from py27hash.frozenset import FrozenSet
+from py27hash.hash import hash27
+from py27hash.set import Set
+
+
+class TestFrozenSet(unittest.TestCase):
+    def test_order(self):
+        s = Set()
+        for x in range(100):
+            s.add(x * 8)
+
+        # Same order as a Set, including sources that are only iterated once
+        self.assertEqual(list(FrozenSet(x * 8 for x in range(100))), list(s))
+        self.assertEqual(list(FrozenSet(s)), list(Set(s)))
+
+        # Dict subclasses other than Dict are iterated, the same as Set
+        d = OrderedDict((str(x), x) for x in range(21))
+        self.assertEqual(list(FrozenSet(d)), list(Set(d)))
+
+        # FrozenSets are returned as is, copies from other sets are merged in
+        f = FrozenSet(["a%d" % x for x in range(22)])
+        self.assertIs(FrozenSet(f), f)
+        self.assertEqual(list(FrozenSet(f)), list(f))
+        self.assertNotEqual(list(Set(f)), list(f))
+        self.assertEqual(list(FrozenSet(Set(f))), list(Set(f)))
+
+    def test_algebra(self):
+        a = FrozenSet(["a%d" % x for x in range(6)])
+        b = FrozenSet(["a%d" % x for x in range(3, 9)])
+
+        union = ["a1", "a0", "a3", "a2", "a5", "a4", "a7", "a6", "a8"]
+        intersection, difference, rdifference = ["a3", "a5", "a4"], ["a1", "a0", "a2"], ["a8", "a7", "a6"]
+        symmetric = ["a1", "a0", "a2", "a7", "a6", "a8"]
+
+        # Reflected operators are used when frozenset is the left operand
+        for result, expected in [(a.union(b), union), (a | b, union), (frozenset(b) | a, union),
+                                 (a.intersection(b), intersection), (a & b, intersection), (frozenset(b) & a, intersection),
+                                 (a.difference(b), difference), (a - b, difference), (frozenset(b) - a, rdifference),
+                                 (a.symmetric_difference(b), symmetric), (a ^ b, symmetric), (frozenset(b) ^ a, symmetric)]:
+            self.assertIsInstance(result, FrozenSet)
+            self.assertEqual(list(result), expected)
+
+        # Multiple operands, iterables and operations on self
+        self.assertEqual(list(a.union(b, ["a9"])), ["a1", "a0", "a3", "a2", "a5", "a4", "a7", "a6", "a9", "a8"])
+        self.assertEqual(list(a.intersection(b, ["a4", "a5"])), ["a5", "a4"])
+        self.assertEqual(list(a.difference(b, ["a1"])), ["a0", "a2"])
+        self.assertEqual(list(a.symmetric_difference(["a9", "a0"])), ["a1", "a3", "a2", "a5", "a4", "a9"])
+        self.assertEqual(list(a & a), ["a1", "a0", "a3", "a2", "a5", "a4"])
+        self.assertEqual(list(a - a), [])
+
+        # Set operands return a Set, operators only accept sets
+        self.assertIsInstance(Set(b) | a, Set)
+        with self.assertRaises(TypeError):
+            a | [1]  # pylint: disable = W0104
+
+    def test_hash(self):
+        f = FrozenSet([1, 2, 3])
+
+        self.assertEqual(hash27(f), hash27(frozenset([1, 2, 3])))
+        self.assertEqual(hash27(f, 32), 409093564)
+        self.assertEqual(hash(f), hash(frozenset([1, 2, 3])))
+        self.assertEqual(hash27((1, FrozenSet(["q"])), 64), 6941023571900454020)
+
+    def test_keys(self):
+        d = Dict()
+        d[FrozenSet(["a"])] = 1
+        d[FrozenSet(["b", "c"])] = 2
+        d[FrozenSet()] = 3
+        d[FrozenSet([1, 2])] = 4
+
+        self.assertEqual(d.keys(), [FrozenSet([1, 2]), FrozenSet(["b", "c"]), FrozenSet(), FrozenSet(["a"])])
+        self.assertEqual(d[frozenset(["a"])], 1)
+
+    def test_immutable(self):
+        f = FrozenSet([1, 2, 9])
+
+        self.assertIs(f.copy(), f)
+        self.assertFalse(hasattr(f, "add"))
+        self.assertEqual(repr(f), "frozenset([1, 2, 9])")
+
+        loaded = pickle.loads(pickle.dumps(f))
+        self.assertEqual(list(loaded), list(f))
+        self.assertIsInstance(loaded, FrozenSet)
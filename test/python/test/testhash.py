@@ -1,9 +1,21 @@
 # pylint: disable = C0111,W0622,E0401
 
+import ctypes
+import subprocess
 import sys
 import unittest
+import warnings
 
-from py27hash.hash import hash27
+from concurrent.futures import ThreadPoolExecutor
+
+import py27hash.hash
+
+from py27hash.hash import Hash, hash27, hash27_many, hash27_parallel
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 is_32bit = sys.maxsize < 2**32
 
@@ -25,6 +37,30 @@ class TestHash(unittest.TestCase):
         expected = 15344
         self.assertEqual(hash27(15344), expected)
 
+    def test_lhash(self):
+        self.assertEqual(hash27(2**128 + 12345, 64), 12346)
+        self.assertEqual(hash27(-(2**128 + 12345), 64), -12346)
+        self.assertEqual(hash27(2**64, 64), 1)
+        self.assertEqual(hash27(-2**64, 64), -2)
+        self.assertEqual(hash27(2**64 - 1, 64), -2)
+        self.assertEqual(hash27(-(2**64 - 1), 64), 1)
+        self.assertEqual(hash27(2**63, 64), -2**63)
+        self.assertEqual(hash27(-2**63 - 1, 64), 2**63 - 1)
+        self.assertEqual(hash27(2**61, 64), 2**61)
+        self.assertEqual(hash27(-1, 64), -2)
+
+        # 32-bit builds
+        self.assertEqual(hash27(2**40, 32), 256)
+        self.assertEqual(hash27(-2**31, 32), -2**31)
+        self.assertEqual(hash27(2**31, 32), -2**31)
+
+        # Integral and non-finite floats
+        self.assertEqual(hash27(1e20, 64), 7766279631452241925)
+        self.assertEqual(hash27(2.0**80, 64), 65536)
+        self.assertEqual(hash27(float("inf")), 314159)
+        self.assertEqual(hash27(float("-inf")), -271828)
+        self.assertEqual(hash27(float("nan")), 0)
+
     def test_shash(self):
         expected = -855915088 if is_32bit else 1724133767363937712
         self.assertEqual(hash27("test1234"), expected)
@@ -32,3 +68,174 @@ class TestHash(unittest.TestCase):
     def test_bhash(self):
         expected = -855915088 if is_32bit else 1724133767363937712
         self.assertEqual(hash27("test1234".encode("utf-8")), expected)
+
+    def test_sethash(self):
+        expected = 409093564 if is_32bit else -7699079583225461316
+        self.assertEqual(hash27(frozenset([1, 2, 3])), expected)
+
+        expected = 316570333 if is_32bit else 3138257626259684061
+        self.assertEqual(hash27(frozenset(["a", "b"])), expected)
+
+        self.assertEqual(hash27(frozenset([frozenset([1]), (1, "x"), 2.5]), 64), 4068992041719517406)
+        self.assertEqual(hash27((1, frozenset(["q"])), 64), 6941023571900454020)
+
+    def test_register(self):
+        class Point(object):
+            def __init__(self, x, y):
+                self.x, self.y = x, y
+
+        class Point3(Point):
+            pass
+
+        class Text(str):
+            pass
+
+        # Subclasses of built-in types
+        self.assertEqual(hash27(Text("test1234"), 64), 1724133767363937712)
+        self.assertEqual(hash27(True), 1)
+
+        with self.assertRaises(TypeError):
+            hash27(Point(1, 2))
+
+        Hash.register(Point, lambda value, bits: Hash.thash((value.x, value.y), bits))
+        Hash.register(type(None), lambda value, bits: 0)
+        try:
+            self.assertEqual(hash27(Point(1, 2)), hash27((1, 2)))
+            self.assertEqual(hash27(Point3(1, 2)), hash27((1, 2)))
+            self.assertEqual(hash27((Point(1, 2), None)), hash27(((1, 2), 0)))
+
+            # Re-registering replaces the method, including for cached subclasses
+            Hash.register(Point, lambda value, bits: 7)
+            self.assertEqual(hash27(Point3(1, 2)), 7)
+        finally:
+            Hash.TYPES.pop(Point)
+            Hash.TYPES.pop(type(None))
+            Hash.CACHE.clear()
+
+    def test_override(self):
+        module = py27hash.hash.native
+
+        # Methods registered for built-in types also apply to tuple elements and batches, in both modes
+        Hash.register(int, lambda value, bits: 7)
+        try:
+            for native in (module, None):
+                py27hash.hash.native = native
+                self.assertEqual(hash27((5, "a")), hash27((7, "a")))
+                self.assertEqual(hash27(((5,), 2.5)), hash27(((9,), 2.5)))
+
+            if np:
+                self.assertEqual(hash27_many([5, 6]).tolist(), [7, 7])
+        finally:
+            py27hash.hash.native = module
+            Hash.register(int, Hash.lhash)
+
+        self.assertTrue(Hash.STANDARD)
+        self.assertNotEqual(hash27((5, "a")), hash27((7, "a")))
+
+    def test_memoize(self):
+        class Text(str):
+            pass
+
+        values = ["a", "b", "a", "c", "a", b"a", "b"]
+        expected = [hash27(x) for x in values]
+
+        Hash.memoize(3)
+        try:
+            self.assertEqual([hash27(x) for x in values], expected)
+
+            # "b" was evicted by b"a"
+            info = Hash.memoinfo()
+            self.assertEqual((info.hits, info.misses, info.maxsize, info.currsize), (2, 5, 3, 3))
+
+            # Subclasses aren't memoized
+            self.assertEqual(hash27(Text("a")), hash27("a"))
+            self.assertEqual(Hash.memoinfo().hits, 3)
+
+            # Concurrent use
+            strings = [str(x % 500) for x in range(5000)]
+            with ThreadPoolExecutor(4) as executor:
+                self.assertEqual(list(executor.map(hash27, strings)), [Hash.shash(x) for x in strings])
+
+            # Registering a new method drops memoized hashes
+            Hash.register(bytes, lambda value, bits: 7)
+            self.assertEqual(hash27(b"a"), 7)
+        finally:
+            Hash.register(bytes, Hash.shash)
+            Hash.memoize(0)
+
+        self.assertEqual(hash27(b"a"), hash27("a"))
+
+        self.assertIsNone(Hash.memoinfo())
+
+    def test_parallel(self):
+        values = ["test%d" % x for x in range(2000)] + [("abc", 1), 2**64, 3.5]
+
+        self.assertEqual(list(hash27_parallel(iter(values), workers=2, chunksize=100)), [hash27(x) for x in values])
+        self.assertEqual(list(hash27_parallel(values, 32, 2, 500)), [hash27(x, 32) for x in values])
+        self.assertEqual(list(hash27_parallel([], workers=2)), [])
+
+        # Stopping early shuts down the pool
+        results = hash27_parallel(values, workers=2, chunksize=10)
+        self.assertEqual(next(results), hash27(values[0]))
+        results.close()
+
+        with self.assertRaises(TypeError):
+            list(hash27_parallel([1, [2]], workers=1))
+
+    def test_bits(self):
+        # 32-bit and Windows builds
+        self.assertEqual(hash27(("abc", 1), 32), 2037533451)
+        self.assertEqual(hash27((3.5, 5.83), 32), 864276487)
+        self.assertEqual(hash27(1235.333333, 32), -886554284)
+        self.assertEqual(hash27("test1234", 32), -855915088)
+        self.assertEqual(hash27(b"test1234", 32), -855915088)
+
+        # 64-bit builds
+        self.assertEqual(hash27(("abc", 1), 64), -6007909421085996277)
+        self.assertEqual(hash27("test1234", 64), 1724133767363937712)
+
+    def test_clong(self):
+        for x in [0, 1, -1, 2**31 - 1, 2**31, -2**31 - 1, 2**63 - 1, 2**63, 2**64 + 5, -2**64 - 5, 3 * 2**70 + 11]:
+            self.assertEqual(Hash.clong(x), ctypes.c_long(x).value)
+
+    def test_imports(self):
+        # Importing hash module should not load ctypes
+        code = "import sys, py27hash.hash; sys.exit('ctypes' in sys.modules)"
+        self.assertEqual(subprocess.call([sys.executable, "-c", code]), 0)
+
+    @unittest.skipIf(not np, "NumPy not installed")
+    def test_many(self):
+        strings = ["", "a", "test1234", "ab\x00", "\u00e9\u4e2d\U0001f600", "http://example.com/path/%d" % 100]
+        values = [strings, [x.encode("utf-8") for x in strings], np.array(strings), [1235.333333, -0.5, 3.0, 2.5e100],
+                  [15344, -1, 0, 2**62, -2**70], np.arange(-5, 5), [("abc", 1), "test1234", 3.5, 7]]
+
+        for batch in values:
+            for bits in (None, 32, 64):
+                hashes = hash27_many(batch, bits)
+
+                self.assertEqual(hashes.dtype, np.int64)
+                self.assertEqual(hashes.tolist(), [hash27(x.item() if isinstance(x, np.generic) else x, bits) for x in batch])
+
+        # NaN and inf are hashed without NumPy cast warnings
+        batch = [float("nan"), float("inf"), float("-inf"), 2.5]
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            self.assertEqual(hash27_many(batch).tolist(), [hash27(x) for x in batch])
+
+    @unittest.skipIf(not py27hash.hash.native, "Compiled hash functions not built")
+    def test_native(self):
+        values = ["", "a", "test1234", "\u00e9\u4e2d\U0001f600", b"", b"\xff\x00abc", 1235.333333, -0.5, 1e-300, 7.0,
+                  1e20, 2.0**80, float("inf"), float("-inf"), float("nan"), (), ("abc", 1), (3.5, 5.83),
+                  ((1, ("b", 2.25)), b"x", True, -1), (2**64, -2**70, 2**40, 2**128 + 12345)]
+
+        module = py27hash.hash.native
+        native = [hash27(x, bits) for x in values for bits in (32, 64)]
+
+        # Compare with pure Python implementation
+        py27hash.hash.native = None
+        try:
+            python = [hash27(x, bits) for x in values for bits in (32, 64)]
+        finally:
+            py27hash.hash.native = module
+
+        self.assertEqual(native, python)
@@ -0,0 +1,200 @@
+# pylint: disable = C0111,W0622,E0401
+
+import pickle
+import sys
+import tracemalloc
+import unittest
+
+from array import array
+
+from py27hash.hash import hash27
+from py27hash.key import Keys
+
+
+class TestKeys(unittest.TestCase):
+    def test_collisions(self):
+        k = Keys()
+
+        for x in range(20):
+            k.add(x * 8)
+
+        self.assertEqual(k.keys(), [0, 32, 152, 96, 120, 48, 8, 64, 128, 80, 16, 40, 144, 104, 112, 56, 24, 72, 136, 88])
+
+    def test_iterate(self):
+        k = Keys()
+
+        for x in range(20):
+            k.add(x * 8)
+
+            # Iterating between inserts must not change placement
+            self.assertEqual(len(list(k)), x + 1)
+
+        self.assertEqual(k.keys(), [0, 32, 152, 96, 120, 48, 8, 64, 128, 80, 16, 40, 144, 104, 112, 56, 24, 72, 136, 88])
+
+    def test_dummy(self):
+        k = Keys()
+
+        for x in range(20):
+            k.add(x * 8)
+
+        for x in range(0, 20, 3):
+            k.remove(x * 8)
+
+        # New keys reuse dummy slots
+        for x in range(100, 104):
+            k.add(x * 8)
+
+        self.assertEqual(k.keys(), [128, 8, 16, 152, 800, 808, 816, 136, 56, 64, 32, 80, 824, 88, 104, 112, 40])
+
+    def test_churn(self):
+        k = Keys()
+
+        for x in range(1000):
+            k.add(x)
+            if x >= 5:
+                k.remove(x - 5)
+
+        # Dummy entries are counted as fill and trigger resizes
+        self.assertEqual(k.keys(), [995, 996, 997, 998, 999])
+        self.assertEqual(k.mask, 31)
+
+    def test_hashes(self):
+        k = Keys()
+
+        for x in range(100):
+            k.add(str(x))
+
+        # Hashes are returned along with keys, including for copies
+        keys, hashes = k.entries()
+        self.assertEqual(keys, k.keys())
+        self.assertEqual(list(hashes), [hash27(x) for x in k])
+
+        keys, hashes = k.copy().entries()
+        self.assertEqual(list(hashes), [hash27(x) for x in keys])
+
+    def test_extend(self):
+        k = Keys()
+        k.extend(list(range(10)) + [100, 100, 5])
+
+        self.assertEqual(k.keys(), list(range(10)) + [100])
+
+    def test_pickle(self):
+        k = Keys()
+
+        for x in range(100):
+            k.add(str(x))
+
+        for x in range(0, 100, 3):
+            k.remove(str(x))
+
+        # Python 2.7 deserialization re-adds keys in iteration order
+        expected = Keys()
+        for x in k:
+            expected.add(x)
+
+        state = k.__getstate__()
+        self.assertEqual(state["version"], Keys.VERSION)
+
+        loaded = pickle.loads(pickle.dumps(k))
+        self.assertEqual(loaded.keys(), expected.keys())
+        self.assertEqual(loaded.slots(), expected.slots())
+        self.assertEqual((loaded.mask, loaded.fill, loaded.finger), (expected.mask, expected.fill, expected.finger))
+
+        # Arrays are byte swapped when loaded on a platform with a different byte order
+        swapped = dict(state, byteorder="big" if sys.byteorder == "little" else "little")
+        for name in ["slots", "hashes"]:
+            values = array("q")
+            values.frombytes(state[name])
+            values.byteswap()
+            swapped[name] = values.tobytes()
+
+        loaded = Keys.__new__(Keys)
+        loaded.__setstate__(swapped)
+        self.assertEqual((loaded.keys(), loaded.slots()), (expected.keys(), expected.slots()))
+
+        # States pickled by earlier versions
+        loaded = Keys.__new__(Keys)
+        loaded.__setstate__({"keylist": k.keys(), "bits": None, "sizebits": None})
+        self.assertEqual((loaded.keys(), loaded.slots()), (expected.keys(), expected.slots()))
+
+        with self.assertRaises(ValueError):
+            Keys.__new__(Keys).__setstate__(dict(state, version=Keys.VERSION + 1))
+
+    def test_copy(self):
+        k = Keys()
+        for x in range(100):
+            k.add(str(x))
+
+        expected = Keys()
+        expected.merge(k)
+
+        # Copies share the cached copy layout until they change
+        a, b = k.copy(), k.copy()
+        self.assertIs(a.table, b.table)
+        self.assertEqual(a.keys(), expected.keys())
+
+        a.add("new")
+        b.remove("5")
+        k.add("other")
+
+        self.assertIsNot(a.table, b.table)
+        self.assertEqual(b.keys(), [x for x in expected.keys() if x != "5"])
+
+        expected.add("new")
+        self.assertEqual(a.keys(), expected.keys())
+        self.assertNotIn("new", b.keys())
+        self.assertNotIn("other", a.keys())
+
+        # Source changes drop the cached layout
+        expected = Keys()
+        expected.merge(k)
+        self.assertEqual(k.copy().keys(), expected.keys())
+
+    def test_memory(self):
+        # Documented bounds, not counting the keys themselves. Small instances are bounded per instance, larger ones
+        # per key. Sizes include the upper bound reached right after a resize.
+        bounds = [(range(1, 5), 264), (range(5, 9), 320), (range(9, 11), 384)]
+        bounds += [([size], 22 * size) for size in [100, 342, 1000, 1366, 5462]]
+
+        # Object headers and list over-allocation are larger before Python 3.9
+        overhead = 0 if sys.version_info >= (3, 9) else 64
+
+        for sizes, bound in bounds:
+            for size in sizes:
+                keys = ["key%d" % x for x in range(size)]
+                self.assertLessEqual(self.allocated(keys, max(1, 1000 // size)), bound + overhead)
+
+        # Compact instances don't have a __dict__
+        self.assertFalse(hasattr(Keys(), "__dict__"))
+
+    def allocated(self, keys, count):
+        """
+        Measures the average memory allocated by a Keys instance.
+
+        Args:
+            keys: keys to add
+            count: number of instances to measure
+
+        Returns:
+            bytes allocated per instance
+        """
+
+        instances = []
+
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+
+            for _ in range(count):
+                k = Keys()
+                for key in keys:
+                    k.add(key)
+
+                instances.append(k)
+
+            # Exclude the list holding the instances
+            size = tracemalloc.get_traced_memory()[0] - start - sys.getsizeof(instances)
+        finally:
+            tracemalloc.stop()
+
+        return size / count
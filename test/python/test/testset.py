@@ -5,12 +5,17 @@ import os
 import sys
 import unittest
 
+from py27hash.dict import Dict
 from py27hash.hash import hash27
 from py27hash.set import Set
 
 is_32bit = sys.maxsize < 2**32
 
 
+class Set32(Set):
+    bits = 32
+
+
 class TestSet(unittest.TestCase):
     def test_small(self):
         d = Set()
@@ -122,6 +127,21 @@ class TestSet(unittest.TestCase):
         expected = 1667650642 if is_32bit else -2555609460481043374
         self.assertEqual(hash27("".join([str(x) for x in d])), expected)
 
+    def test_fromdict(self):
+        d = Dict()
+        for x in range(100):
+            d[str(x)] = x
+
+        expected = -17565798 if is_32bit else -2999692970150332518
+        self.assertEqual(hash27("".join(Set(d))), expected)
+
+        # Dicts are merged with a single presize
+        s = Set(["a", "b", "c"])
+        s.update(d)
+
+        expected = 28991413 if is_32bit else -7682198021375107147
+        self.assertEqual(hash27("".join(s)), expected)
+
     def test_pop(self):
         d = Set()
 
@@ -132,3 +152,121 @@ class TestSet(unittest.TestCase):
 
         expected = 267158528 if is_32bit else -434207861779954688
         self.assertEqual(hash27("".join(d)), expected)
+
+    def test_bits(self):
+        d = Set32()
+
+        for x in range(500):
+            d.add(str(x))
+
+        d.pop()
+
+        # Order matches 32-bit Python 2.7 builds on all platforms
+        self.assertEqual(hash27("".join(d), 32), 267158528)
+
+    def test_union(self):
+        a = Set(str(x) for x in range(300))
+        b = Set(str(x) for x in range(150, 500))
+
+        d = a.union(b, [str(x) for x in range(600, 620)])
+
+        expected = 1942721346 if is_32bit else 7803115289898095426
+        self.assertEqual(hash27("".join(d)), expected)
+
+        expected = 1726866304 if is_32bit else -4815914202706353280
+        self.assertEqual(hash27("".join(a | b)), expected)
+
+    def test_intersection(self):
+        a = Set(str(x) for x in range(300))
+        b = Set(str(x) for x in range(150, 500))
+
+        expected = 218254921 if is_32bit else -8263514413673055839
+        self.assertEqual(hash27("".join(a & b)), expected)
+
+        # Smaller operand is iterated
+        d = Set(str(x) for x in range(290, 310)).intersection(a)
+
+        expected = 1025465109 if is_32bit else -6819658399955854571
+        self.assertEqual(hash27("".join(d)), expected)
+
+        d = a.copy()
+        d &= b
+
+        expected = -1949044559 if is_32bit else -362250840912432975
+        self.assertEqual(hash27("".join(d)), expected)
+
+    def test_difference(self):
+        a = Set(str(x) for x in range(300))
+        b = Set(str(x) for x in range(150, 500))
+
+        expected = -312823067 if is_32bit else 6863980904090088165
+        self.assertEqual(hash27("".join(a - b)), expected)
+
+        # Deleted slots are resized away once they pass 1/5 of the table
+        d = a.copy()
+        d -= b
+        d.add("1000")
+
+        expected = -1200258668 if is_32bit else -7434280660464467564
+        self.assertEqual(hash27("".join(d)), expected)
+
+    def test_symmetric(self):
+        a = Set(str(x) for x in range(300))
+        b = Set(str(x) for x in range(150, 500))
+
+        expected = 255596073 if is_32bit else 491045541538564841
+        self.assertEqual(hash27("".join(a ^ b)), expected)
+
+        d = a.copy()
+        d ^= b
+
+        expected = -3965859 if is_32bit else 8326173327429434461
+        self.assertEqual(hash27("".join(d)), expected)
+
+    def test_discard(self):
+        d = Set(["a", "b"])
+
+        # Missing elements are ignored
+        d.discard("c")
+        d.discard("a")
+
+        self.assertEqual(list(d), ["b"])
+        self.assertRaises(KeyError, d.remove, "c")
+
+    def test_none(self):
+        d = Set(["a"])
+
+        # None has no Python 2.7 hash, it's rejected before the Set changes
+        with self.assertRaises(TypeError):
+            d.add(None)
+
+        self.assertEqual(list(d), ["a"])
+        self.assertEqual(len(d), 1)
+
+    def test_updateerror(self):
+        s = Set()
+
+        # Elements before the failing element are kept, the same as Python 2.7
+        with self.assertRaises(TypeError):
+            s.update([1, "a", [], 2])
+
+        self.assertEqual(len(s), 2)
+        self.assertEqual(sorted(s, key=str), [1, "a"])
+        self.assertIn(s.pop(), (1, "a"))
+        self.assertEqual(len(s), len(list(s)))
+
+    def test_dictsubclass(self):
+        class Empty(dict):
+            def __contains__(self, key):
+                return True
+
+            def __iter__(self):
+                return iter([])
+
+        # Dict subclasses other than Dict are handled as iterables
+        s = Set(["a", "b"])
+        self.assertEqual(sorted(s.difference(Empty(a=1))), ["a", "b"])
+        self.assertEqual(sorted(s.symmetric_difference(Empty(a=1))), ["a", "b"])
+
+        s.update(Empty(c=1))
+        self.assertEqual(sorted(s), ["a", "b"])
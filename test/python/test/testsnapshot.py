@@ -0,0 +1,80 @@
+# pylint: disable = C0111,W0622,E0401
+
+import os
+import tempfile
+import unittest
+
+from py27hash.dict import Dict
+from py27hash.snapshot import Snapshot
+
+
+class Dict32(Dict):
+    bits = 32
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".snap")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_dict(self):
+        d = Dict()
+
+        for x in range(500):
+            d[str(x)] = x
+
+        for x in range(0, 500, 7):
+            del d[str(x)]
+
+        d[(1, "a")] = [1, 2]
+        d[b"bytes"] = "\xe9"
+        d[3.5] = None
+        d[7] = 7
+
+        Snapshot.write(self.path, d)
+
+        with Snapshot(self.path) as s:
+            self.assertEqual(len(s), len(d))
+            self.assertEqual(s.keys(), d.keys())
+            self.assertEqual(s.items(), d.items())
+            self.assertEqual(list(s.itervalues()), d.values())
+
+            for k in d:
+                self.assertEqual(s[k], d[k])
+
+            # Deleted keys and equal keys of other types
+            self.assertNotIn("0", s)
+            self.assertEqual(s.get("0", -1), -1)
+            self.assertEqual(s[7.0], 7)
+            self.assertEqual(s[3.5], None)
+
+            self.assertRaises(KeyError, s.__getitem__, "missing")
+
+    def test_mapping(self):
+        Snapshot.write(self.path, {1: "a", 9: "b", 17: "c"})
+
+        # Ordered as if keys were added to a Python 2.7 dict
+        with Snapshot(self.path) as s:
+            self.assertEqual(s.items(), [(1, "a"), (17, "c"), (9, "b")])
+
+    def test_bits(self):
+        d = Dict32()
+        for x in range(100):
+            d[str(x)] = x
+
+        Snapshot.write(self.path, d)
+
+        with Snapshot(self.path) as s:
+            self.assertEqual(s.bits, 32)
+            self.assertEqual(s.keys(), d.keys())
+            self.assertEqual(s["50"], 50)
+
+    def test_invalid(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\0" * 128)
+
+        with self.assertRaises(ValueError):
+            Snapshot(self.path)
@@ -0,0 +1,54 @@
+# pylint: disable = C0111,W0622,E0401
+
+import unittest
+
+from py27hash.dict import Dict
+from py27hash.stream import Stream
+
+
+class TestStream(unittest.TestCase):
+    def test_order(self):
+        keys = [str(x % 700) for x in range(1000)] + [(1, "a"), b"bytes", 3.5, "\xe9", 1, 1.0, True]
+
+        d = Dict()
+        for k in keys:
+            if k not in d:
+                d[k] = 1
+
+        with Stream() as s:
+            s.extend(keys)
+
+            self.assertEqual(len(s), len(d))
+            self.assertEqual(list(s), d.keys())
+
+            # First occurrence of each key
+            self.assertEqual([keys[x] for x in s.indices()], d.keys())
+            self.assertEqual(list(s.indices()), [keys.index(k) for k in d.keys()])
+            self.assertEqual([x for x, _ in s.slots()], list(s.indices()))
+
+    def test_spill(self):
+        keys = [str(x) for x in range(20000)]
+
+        d = Dict()
+        for k in keys:
+            d[k] = 1
+
+        # All columns backed by temporary files
+        with Stream(memory=0) as s:
+            for k in keys:
+                s.add(k)
+
+            self.assertEqual(list(s), d.keys())
+            self.assertEqual([i for _, i in s.slots()], list(d.keylist.slots()))
+
+    def test_bits(self):
+        class Dict32(Dict):
+            bits = 32
+
+        d = Dict32()
+        for x in range(500):
+            d[str(x)] = x
+
+        with Stream(32) as s:
+            s.extend(str(x) for x in range(500))
+            self.assertEqual(list(s), d.keys())
@@ -0,0 +1,43 @@
+# pylint: disable = C0111,W0622,E0401
+
+import io
+import unittest
+
+from py27hash.dict import Dict
+from py27hash.set import Set
+from py27hash.text import Text, repr27
+
+
+class TestText(unittest.TestCase):
+    def test_repr(self):
+        d = Dict()
+        d[1] = ["\xe9", "it's", "a\"b'c", "\t\x00", 2**63, -2**63 - 1, 2**63 - 1]
+        d[2] = (1,)
+        d[9] = Set([8, 0])
+
+        expected = "{1: [u'\\xe9', \"it's\", 'a\"b\\'c', '\\t\\x00', 9223372036854775808L, -9223372036854775809L, " \
+                   "9223372036854775807], 2: (1,), 9: set([8, 0])}"
+
+        self.assertEqual(repr27(d, 64), expected)
+        self.assertEqual(repr27(d, 32).count("L"), 3)
+
+    def test_containers(self):
+        l = [1]
+        l.append(l)
+
+        self.assertEqual(repr27((l, (), frozenset(), b"\xff")), "([1, [...]], (), frozenset([]), '\\xff')")
+        self.assertEqual(repr27({1: None, 0: None}), "{0: None, 1: None}")
+
+    def test_write(self):
+        d = Dict.fromkeys(range(10000), "x")
+
+        # Buffer is flushed multiple times
+        fp = io.StringIO()
+        Text(fp).write(d)
+
+        self.assertEqual(fp.getvalue(), str(d))
+        self.assertEqual(fp.getvalue(), "{%s}" % ", ".join("%d: 'x'" % x for x in d))
+
+        fp = io.StringIO()
+        d.write_repr(fp)
+        self.assertEqual(fp.getvalue(), repr(d))
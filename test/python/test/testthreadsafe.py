@@ -0,0 +1,85 @@
+# pylint: disable = C0111,W0622,E0401
+
+import pickle
+import threading
+import unittest
+
+from py27hash.dict import Dict
+from py27hash.set import Set
+from py27hash.threadsafe import ThreadSafeDict, ThreadSafeSet
+
+
+class TestThreadSafe(unittest.TestCase):
+    def test_dict(self):
+        d, t = Dict(), ThreadSafeDict()
+        for x in range(500):
+            d[str(x)] = t[str(x)] = x
+
+        for x in range(0, 500, 3):
+            del d[str(x)]
+            del t[str(x)]
+
+        d.update(a=1, b=2)
+        t.update(a=1, b=2)
+
+        self.assertEqual(t.keys(), d.keys())
+        self.assertEqual(t.items(), d.items())
+        self.assertEqual(list(t.viewvalues()), d.values())
+        self.assertEqual(str(t), str(d))
+
+        self.assertEqual(t.copy().keys(), d.copy().keys())
+        self.assertEqual(pickle.loads(pickle.dumps(t)).keys(), pickle.loads(pickle.dumps(d)).keys())
+        self.assertIsInstance(pickle.loads(pickle.dumps(t)), ThreadSafeDict)
+
+        self.assertEqual(t.popitem(), d.popitem())
+        self.assertEqual(t.pop("a"), d.pop("a"))
+        self.assertEqual(t.keys(), d.keys())
+
+    def test_set(self):
+        s, t = Set(), ThreadSafeSet()
+        for x in range(500):
+            s.add(x * 7)
+            t.add(x * 7)
+
+        for x in range(0, 500, 4):
+            s.remove(x * 7)
+            t.remove(x * 7)
+
+        self.assertEqual(list(t), list(s))
+        self.assertEqual(str(t), str(s))
+        self.assertEqual(list(t.copy()), list(s.copy()))
+        self.assertEqual(list(pickle.loads(pickle.dumps(t))), list(pickle.loads(pickle.dumps(s))))
+        self.assertEqual(t.pop(), s.pop())
+
+    def test_threads(self):
+        t = ThreadSafeDict()
+        errors = []
+
+        def write(offset):
+            for x in range(1000):
+                t[(offset, x)] = x
+                if x % 3 == 0:
+                    del t[(offset, x)]
+
+        def read():
+            try:
+                for _ in range(50):
+                    # Each snapshot is consistent
+                    items = t.items()
+                    self.assertEqual(len(set(k for k, _ in items)), len(items))
+                    self.assertTrue(all(k[1] == v for k, v in items))
+            except AssertionError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(x,)) for x in range(4)] + \
+                  [threading.Thread(target=read) for _ in range(4)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(t), len(t.keys()))
+        self.assertEqual(sorted(t.keys()), sorted(dict.keys(t)))